@@ -1,12 +1,26 @@
 from manim import *
-import scipy.stats as stats
 import numpy as np
 import math
 
+from async_writer import AsyncFileWriter
+import t21_engine
+import t21_montecarlo
+from frame_skip import FrameDiffMixin
+from keyframes import KeyframeMixin
+from profiling import ProfileMixin
+from render_cache import SectionCacheMixin
+from scene_template import TemplateMixin
+from text_cache import cached_text
+
 
 # 如果直接运行脚本，请保留文件末尾的 if __name__ == "__main__": 块
 
-class T21ScreeningProcess(Scene):
+class T21ScreeningProcess(ProfileMixin, KeyframeMixin, FrameDiffMixin, TemplateMixin, SectionCacheMixin, Scene):
+    # 光栅化与编码并行 (encoder_pool 常驻编码进程)
+    file_writer_class = AsyncFileWriter
+    # 批量筛查中的某一行 (t21_engine.pick 的结果)，为 None 时使用模拟数据
+    record = None
+
     def construct(self):
         # === 全局配置与模拟数据 ===
         self.data = {
@@ -14,18 +28,23 @@ class T21ScreeningProcess(Scene):
             "weight": 75.0,
             "val_afp": 30.0,
             "val_hcg": 65.0,
-            "median_afp": 35.0,
-            "median_hcg": 30.0
+            "ga_day": 112,  # 16w0d; 中位数与年龄先验由 t21_tables 查表
         }
-
-        self.intro_scene()
-        mom_afp, mom_hcg = self.calculation_scene()
-        lr_total = self.gaussian_analysis_scene(mom_afp, mom_hcg)
-        self.risk_assessment_scene(self.data["age"], lr_total)
+        if self.record is not None:
+            self.data.update({k: v for k, v in self.record.items() if k in t21_engine.INPUTS})
+        # 与批量计算使用同一引擎
+        self.result = t21_engine.screen_one(self.data)
+
+        # 患者数值只影响后三段，换患者时片头直接复用缓存
+        self.cached_section(self.intro_scene)
+        mom_afp, mom_hcg = self.cached_section(self.calculation_scene, inputs=(self.data, self.result))
+        lr_total = self.cached_section(self.gaussian_analysis_scene, mom_afp, mom_hcg, inputs=self.result,
+                                       deps=(self.build_gaussian_axes,))
+        self.cached_section(self.risk_assessment_scene, self.data["age"], lr_total, inputs=self.result)
 
     def intro_scene(self):
-        title = Text("T21 Screening Algorithm", font_size=48).to_edge(UP)
-        subtitle = Text("Visualization of process", font_size=24, color=GRAY).next_to(title, DOWN)
+        title = cached_text("T21 Screening Algorithm", font_size=48).to_edge(UP)
+        subtitle = cached_text("Visualization of process", font_size=24, color=GRAY).next_to(title, DOWN)
         self.play(Write(title), FadeIn(subtitle))
         self.wait(1)
         self.play(FadeOut(subtitle))
@@ -33,14 +52,14 @@ class T21ScreeningProcess(Scene):
 
     def calculation_scene(self):
         # 简化版：不使用 LaTeX 公式，使用普通文本
-        t_info = Text("Step 1: Calculate MoM (Multiples of Median)", font_size=30, color=BLUE).to_edge(UP).shift(
+        t_info = cached_text("Step 1: Calculate MoM (Multiples of Median)", font_size=30, color=BLUE).to_edge(UP).shift(
             DOWN * 1)
         self.play(Transform(self.title, t_info))
 
-        raw_mom_hcg = self.data['val_hcg'] / self.data['median_hcg']
+        raw_mom_hcg = self.result['raw_mom_hcg']
 
         # 使用 Text 而不是 MathTex
-        txt_calc = Text(f"Raw hCG MoM = {self.data['val_hcg']} / {self.data['median_hcg']} = {raw_mom_hcg:.2f}",
+        txt_calc = Text(f"Raw hCG MoM = {self.data['val_hcg']} / {self.result['median_hcg']:.1f} = {raw_mom_hcg:.2f}",
                         font_size=24)
         txt_calc.move_to(UP * 0.5)
 
@@ -48,10 +67,9 @@ class T21ScreeningProcess(Scene):
         self.wait(1)
 
         # 权重校正
-        exp_mom = 0.28 + (43.0 / self.data['weight'])
-        factor = 1.0 / exp_mom
-        corr_mom_hcg = raw_mom_hcg * factor
-        corr_mom_afp = (self.data['val_afp'] / self.data['median_afp']) * factor
+        factor = self.result['factor']
+        corr_mom_hcg = self.result['mom_hcg']
+        corr_mom_afp = self.result['mom_afp']
 
         txt_corr = Text(f"Weight Correction Factor: {factor:.2f}", font_size=24).next_to(txt_calc, DOWN)
         txt_final = Text(f"Corrected hCG MoM = {corr_mom_hcg:.2f}", font_size=30, color=YELLOW).next_to(txt_corr, DOWN)
@@ -63,10 +81,7 @@ class T21ScreeningProcess(Scene):
         self.play(FadeOut(txt_calc), FadeOut(txt_corr), FadeOut(txt_final))
         return corr_mom_afp, corr_mom_hcg
 
-    def gaussian_analysis_scene(self, mom_afp, mom_hcg):
-        t_info = Text("Step 2: Gaussian Likelihood (LR)", font_size=30, color=YELLOW).to_edge(UP).shift(DOWN * 1)
-        self.play(Transform(self.title, t_info))
-
+    def build_gaussian_axes(self):
         axes = Axes(
             x_range=[-1, 1, 0.5],
             y_range=[0, 3, 1],
@@ -75,16 +90,26 @@ class T21ScreeningProcess(Scene):
         ).shift(DOWN * 0.5)
 
         # 绘制曲线
-        norm_mean, norm_std = 0.0, 0.15
-        t21_mean, t21_std = 0.3, 0.18
-        curve_norm = axes.plot(lambda x: stats.norm.pdf(x, norm_mean, norm_std), color=BLUE)
-        curve_t21 = axes.plot(lambda x: stats.norm.pdf(x, t21_mean, t21_std), color=RED)
+        norm_mean, norm_std = t21_engine.NORM_MEAN, t21_engine.NORM_STD
+        t21_mean, t21_std = t21_engine.T21_MEAN, t21_engine.T21_STD
+        curve_norm = axes.plot(lambda x: t21_engine.norm_pdf(x, norm_mean, norm_std), color=BLUE)
+        curve_t21 = axes.plot(lambda x: t21_engine.norm_pdf(x, t21_mean, t21_std), color=RED)
+        return VGroup(axes, curve_norm, curve_t21)
+
+    def gaussian_analysis_scene(self, mom_afp, mom_hcg):
+        t_info = cached_text("Step 2: Gaussian Likelihood (LR)", font_size=30, color=YELLOW).to_edge(UP).shift(DOWN * 1)
+        self.play(Transform(self.title, t_info))
+
+        # 坐标轴与两条分布曲线与患者无关，批量渲染时只构建一次
+        axes, curve_norm, curve_t21 = self.template("t21_gaussian_axes", self.build_gaussian_axes)
+        norm_mean, norm_std = t21_engine.NORM_MEAN, t21_engine.NORM_STD
+        t21_mean, t21_std = t21_engine.T21_MEAN, t21_engine.T21_STD
 
         self.play(Create(axes), Create(curve_norm), Create(curve_t21))
 
         # 标注
-        t_norm = Text("Normal", color=BLUE, font_size=20).next_to(axes.c2p(0, 2.7), UP)
-        t_t21 = Text("T21", color=RED, font_size=20).next_to(axes.c2p(0.3, 2.2), UP)
+        t_norm = cached_text("Normal", color=BLUE, font_size=20).next_to(axes.c2p(0, 2.7), UP)
+        t_t21 = cached_text("T21", color=RED, font_size=20).next_to(axes.c2p(0.3, 2.2), UP)
         self.play(Write(t_norm), Write(t_t21))
 
         # 患者位置
@@ -93,9 +118,9 @@ class T21ScreeningProcess(Scene):
         self.play(Create(line))
 
         # 计算高度
-        y_norm = stats.norm.pdf(log_hcg, norm_mean, norm_std)
-        y_t21 = stats.norm.pdf(log_hcg, t21_mean, t21_std)
-        lr = y_t21 / y_norm
+        y_norm = t21_engine.norm_pdf(log_hcg, norm_mean, norm_std)
+        y_t21 = t21_engine.norm_pdf(log_hcg, t21_mean, t21_std)
+        lr = self.result['lr']
 
         dot_norm = Dot(axes.c2p(log_hcg, y_norm), color=BLUE)
         dot_t21 = Dot(axes.c2p(log_hcg, y_t21), color=RED)
@@ -109,18 +134,18 @@ class T21ScreeningProcess(Scene):
         self.wait(2)
 
         self.play(FadeOut(Group(axes, curve_norm, curve_t21, t_norm, t_t21, line, dot_norm, dot_t21, txt_lr, bg)))
-        return lr * 0.8  # 假定总LR
+        return self.result['total_lr']  # 总LR: AFP + hCG 二元高斯
 
     def risk_assessment_scene(self, age, total_lr):
-        t_info = Text("Step 3: Final Risk", font_size=30, color=GREEN).to_edge(UP).shift(DOWN * 1)
+        t_info = cached_text("Step 3: Final Risk", font_size=30, color=GREEN).to_edge(UP).shift(DOWN * 1)
         self.play(Transform(self.title, t_info))
 
-        prior = 150
-        final_denom = prior / total_lr
+        prior = self.result['prior']
+        final_denom = self.result['risk_denom']
 
-        t1 = Text(f"Prior Risk (Age {age}): 1/{prior}", font_size=30).shift(UP)
-        t2 = Text(f"Likelihood Ratio: {total_lr:.2f}", font_size=30)
-        t3 = Text(f"Final Risk = 1 / ({prior} / {total_lr:.2f})", font_size=30).next_to(t2, DOWN)
+        t1 = Text(f"Prior Risk (Age {age}): 1/{prior:.0f}", font_size=30).shift(UP)
+        t2 = Text(f"Likelihood Ratio (AFP + hCG): {total_lr:.2f}", font_size=30)
+        t3 = Text(f"Final Risk = 1 / ({prior:.0f} / {total_lr:.2f})", font_size=30).next_to(t2, DOWN)
         t4 = Text(f"Result: 1 : {int(final_denom)}", font_size=40, color=RED).next_to(t3, DOWN * 2)
 
         self.play(Write(t1), Write(t2))
@@ -129,6 +154,71 @@ class T21ScreeningProcess(Scene):
         self.wait(2)
 
 
+class T21PerformanceViz(ProfileMixin, KeyframeMixin, FrameDiffMixin, TemplateMixin, SectionCacheMixin, Scene):
+    """人群层面的筛查性能: Monte Carlo 得到的检出率 / 假阳性率随切割值变化 (t21_montecarlo)"""
+
+    file_writer_class = AsyncFileWriter
+    # 每组 (患病 / 未患病) 模拟的孕妇数
+    samples = 1_000_000
+    seed = 0
+    cutoff = t21_montecarlo.DEFAULT_CUTOFF
+    # (ages, weights)，为 None 时使用示例年龄构成
+    age_mix = None
+    workers = None
+
+    def construct(self):
+        title = cached_text("T21 Screening Performance (Monte Carlo)", font_size=40).to_edge(UP)
+        self.add(title)
+        curves = t21_montecarlo.simulate(self.samples, age_mix=self.age_mix, seed=self.seed, workers=self.workers)
+        self.cached_section(self.performance_scene, curves, inputs=(curves, self.cutoff, self.samples))
+
+    def build_performance_axes(self):
+        """x 为 log10(切割值 N)，y 为比例; 刻度用 Text 避免 LaTeX"""
+        axes = Axes(x_range=[1, 4, 1], y_range=[0, 1, 0.25], x_length=9, y_length=4.5,
+                    axis_config={"include_tip": False}).shift(DOWN * 0.5)
+        labels = VGroup(*[cached_text(f"1:{10 ** k}", font_size=16).next_to(axes.c2p(k, 0), DOWN)
+                          for k in range(1, 5)])
+        labels.add(*[cached_text(f"{p}%", font_size=16).next_to(axes.c2p(1, p / 100), LEFT)
+                     for p in (0, 50, 100)])
+        labels.add(cached_text("Risk cutoff", font_size=18).next_to(axes, DOWN, buff=0.5))
+        return VGroup(axes, labels)
+
+    def performance_scene(self, curves):
+        axes, labels = self.template("t21_performance_axes", self.build_performance_axes)
+        self.play(Create(axes), Write(labels))
+
+        x = np.log10(curves["cutoffs"])
+        dr_curve = axes.plot_line_graph(x, curves["dr"], add_vertex_dots=False, line_color=RED)
+        fpr_curve = axes.plot_line_graph(x, curves["fpr"], add_vertex_dots=False, line_color=BLUE)
+        dr_label = cached_text("Detection Rate", font_size=20, color=RED).next_to(axes.c2p(4, curves["dr"][-1]), UP)
+        fpr_label = cached_text("False Positive Rate", font_size=20, color=BLUE).next_to(
+            axes.c2p(4, curves["fpr"][-1]), DOWN)
+        self.play(Create(dr_curve), Create(fpr_curve), run_time=2)
+        self.play(FadeIn(dr_label), FadeIn(fpr_label))
+
+        # 切割值从 1:10 扫到目标值，实时读出 DR / FPR
+        log_cutoff = ValueTracker(x[0])
+        title_pos = axes.get_top() + UP * 0.3
+
+        def readout():
+            cut = 10 ** log_cutoff.get_value()
+            dr, fpr = t21_montecarlo.at_cutoff(curves, cut)
+            line = DashedLine(axes.c2p(log_cutoff.get_value(), 0), axes.c2p(log_cutoff.get_value(), 1), color=YELLOW)
+            dots = VGroup(Dot(axes.c2p(log_cutoff.get_value(), dr), color=RED),
+                          Dot(axes.c2p(log_cutoff.get_value(), fpr), color=BLUE))
+            text = Text(f"1:{cut:.0f}   DR = {dr:.1%}   FPR = {fpr:.1%}", font_size=24).next_to(title_pos, DOWN)
+            return VGroup(line, dots, text)
+
+        marker = always_redraw(readout)
+        self.add(marker)
+        self.play(log_cutoff.animate.set_value(math.log10(self.cutoff)), run_time=3)
+        marker.clear_updaters()
+
+        note = Text(f"{curves['n_affected']:,} simulated pregnancies per group", font_size=18, color=GRAY).to_corner(DR)
+        self.play(FadeIn(note))
+        self.wait(2)
+
+
 # === 这里就是让你能直接运行的关键 ===
 if __name__ == "__main__":
     if __name__ == "__main__":
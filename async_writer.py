@@ -0,0 +1,72 @@
+import time
+
+from manim import config, logger
+from manim.scene.scene_file_writer import SceneFileWriter
+
+import encoder_pool
+
+# 这些格式由 encoder_pool 的 ffmpeg 编码，其余 (gif / png 序列) 走 manim 默认路径
+POOL_EXTENSIONS = (".mp4", ".mov", ".webm")
+
+
+class AsyncFileWriter(SceneFileWriter):
+    """光栅化与编码异步重叠的 SceneFileWriter
+
+    每个 partial movie 交给 encoder_pool 中的常驻编码进程，write_frame 只把帧放入共享内存队列就返回;
+    finish() 前等待本场景的全部片段编码完成，再由 manim 拼接。
+    """
+
+    def __init__(self, renderer, scene_name, **kwargs):
+        super().__init__(renderer, scene_name, **kwargs)
+        self._pool = None
+        self._segment = None
+        self._pending = []
+        self._last_submit = None
+        self.stage_seconds = {"rasterize": 0.0, "submit": 0.0}
+        self.frames = 0
+
+    def _use_pool(self):
+        return config.write_to_movie and config.movie_file_extension in POOL_EXTENSIONS
+
+    def begin_animation(self, allow_write=False, file_path=None):
+        if not (allow_write and self._use_pool()):
+            return super().begin_animation(allow_write, file_path)
+        path = file_path or self.sections[-1].partial_movie_files[-1]
+        self._pool = encoder_pool.get_pool(config.pixel_width * config.pixel_height * 4)
+        self._segment = self._pool.open(path, config.pixel_width, config.pixel_height, config.frame_rate)
+        self._pending.append(self._segment)
+        self._last_submit = time.perf_counter()
+
+    def write_frame(self, frame_or_renderer, num_frames=1):
+        if self._segment is None:
+            return super().write_frame(frame_or_renderer, num_frames)
+        started = time.perf_counter()
+        self.stage_seconds["rasterize"] += started - self._last_submit
+        self._pool.submit(self._segment, frame_or_renderer, num_frames)
+        self._last_submit = time.perf_counter()
+        self.stage_seconds["submit"] += self._last_submit - started
+        self.frames += num_frames
+
+    def end_animation(self, allow_write=False):
+        if self._segment is None:
+            return super().end_animation(allow_write)
+        self._pool.close(self._segment)
+        self._segment = None
+
+    def wait_encoded(self):
+        """阻塞到已提交的片段全部写完 (拼接或拷贝 partial movie 之前调用)"""
+        if self._pending:
+            self._pool.wait(self._pending)
+            self._pending = []
+
+    def stage_fps(self):
+        fps = {stage: self.frames / seconds if seconds else 0.0 for stage, seconds in self.stage_seconds.items()}
+        if self._pool is not None:
+            fps["encode"] = self._pool.stage_fps()["encode"]
+        return fps
+
+    def finish(self):
+        self.wait_encoded()
+        if self.frames:
+            logger.info("Pipeline FPS per stage: %s", {k: round(v, 1) for k, v in self.stage_fps().items()})
+        super().finish()
@@ -0,0 +1,242 @@
+"""渲染与数值引擎基准测试
+
+示例:
+    python bench.py                                    # 三个场景 × 默认分辨率 + 数值微基准
+    python bench.py BiochemAlgoViz --resolutions 480p15 720p30 1080p60
+    python bench.py --no-render --xgb-model model.json # 只跑数值微基准 (含 SHAP)
+    python bench.py --save-baseline                    # 本次结果存为基线
+每次结果追加到 bench_history.json; 与 bench_baseline.json 相比，耗时或峰值内存超过 --tolerance 的项
+记为回归，退出码为 1。
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HISTORY_PATH = "bench_history.json"
+BASELINE_PATH = "bench_baseline.json"
+RESOLUTIONS = ("480p15", "720p30")
+# 与基线比较的指标 (越大越差)
+COMPARED = ("wall", "peak_rss_mb")
+
+
+def parse_resolution(spec):
+    """"720p30" -> (1280, 720, 30)，宽度按 16:9 取偶数"""
+    height, fps = spec.lower().split("p")
+    height = int(height)
+    return int(round(height * 16 / 9 / 2)) * 2, height, int(fps)
+
+
+def _peak_rss_mb():
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_scene(name, resolution):
+    """在独立进程中渲染一次场景，返回整体与每个子场景 (cached_section) 的指标"""
+    from manim import BLACK, config, tempconfig
+
+    from render_farm import load_scene
+
+    width, height, fps = parse_resolution(resolution)
+    sections = []
+
+    class Timed(load_scene(name)):
+        # 基准测试不能命中段落缓存
+        use_section_cache = False
+
+        def cached_section(self, fn, *args, inputs=(), deps=()):
+            started, video_time = time.perf_counter(), self.renderer.time
+            result = super().cached_section(fn, *args, inputs=inputs, deps=deps)
+            wall = time.perf_counter() - started
+            frames = round((self.renderer.time - video_time) * config.frame_rate)
+            sections.append({"name": fn.__name__, "wall": wall, "frames": frames, "fps": frames / wall,
+                             "mobjects": sum(len(m.get_family()) for m in self.mobjects)})
+            return result
+
+    media_dir = tempfile.mkdtemp(prefix="bench_")
+    overrides = {"background_color": BLACK, "preview": False, "progress_bar": "none", "verbosity": "WARNING",
+                 "disable_caching": True, "media_dir": media_dir, "output_file": f"{name}.mp4",
+                 "pixel_width": width, "pixel_height": height, "frame_rate": fps}
+    try:
+        with tempconfig(overrides):
+            started = time.perf_counter()
+            scene = Timed()
+            scene.render()
+            wall = time.perf_counter() - started
+            frames = round(scene.renderer.time * fps)
+    finally:
+        shutil.rmtree(media_dir, ignore_errors=True)
+
+    key = f"{name}@{resolution}"
+    results = {key: {"wall": wall, "frames": frames, "fps": frames / wall, "peak_rss_mb": _peak_rss_mb(),
+                     "mobjects": max((s["mobjects"] for s in sections), default=0)}}
+    for s in sections:
+        results[f"{key}/{s.pop('name')}"] = s
+    return results
+
+
+def _best_of(fn, repeat):
+    fn()  # 预热: 查表缓存、首次分配
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def bench_rate_a(rows=100_000, n_points=100, repeat=5):
+    import bio_engine
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 60, n_points)
+    absorbance = 0.5 + 0.02 * x + rng.normal(0, 0.01, (rows, n_points))
+    wall = _best_of(lambda: bio_engine.rate_a(absorbance, x, 30, 50, 2), repeat)
+    return {f"rate_a/{rows}x{n_points}": {"wall": wall, "rows_per_s": rows / wall}}
+
+
+def bench_t21(rows=1_000_000, repeat=3):
+    import t21_engine
+
+    rng = np.random.default_rng(0)
+    age = rng.integers(18, 46, rows)
+    weight = rng.normal(62, 10, rows).clip(40, 120)
+    val_afp = rng.lognormal(np.log(35), 0.3, rows)
+    val_hcg = rng.lognormal(np.log(30), 0.4, rows)
+    ga_day = rng.integers(105, 140, rows)
+    wall = _best_of(lambda: t21_engine.screen(age, weight, val_afp, val_hcg, ga_day=ga_day), repeat)
+    return {f"t21_risk/{rows}": {"wall": wall, "rows_per_s": rows / wall}}
+
+
+def bench_shap(model_path, rows=10_000, workers=None, repeat=3):
+    import shap_engine
+    from xgb_engine import FlatForest
+
+    forest = FlatForest.load(model_path)
+    rng = np.random.default_rng(0)
+    x = rng.normal(0, 1, (rows, forest.n_features)).astype(np.float32)
+    x[rng.random(x.shape) < 0.05] = np.nan
+    explainer = shap_engine.TreeShapExplainer(forest)
+    single = _best_of(lambda: explainer.shap_values(x), repeat)
+    results = {f"shap/{rows}": {"wall": single, "rows_per_s": rows / single}}
+    if workers != 1:
+        started = time.perf_counter()
+        shap_engine.shap_values_parallel(model_path, x, workers, chunk_rows=max(rows // (os.cpu_count() or 1), 1))
+        parallel = time.perf_counter() - started
+        results[f"shap_parallel/{rows}"] = {"wall": parallel, "rows_per_s": rows / parallel}
+    return results
+
+
+def run_micro(xgb_model=None, t21_rows=1_000_000, shap_rows=10_000):
+    results = {**bench_rate_a(), **bench_t21(t21_rows)}
+    if xgb_model:
+        results.update(bench_shap(xgb_model, shap_rows))
+    return results
+
+
+def run_render(names, resolutions):
+    # 每个用例一个全新的 spawn 进程，峰值内存与字形 / 模板缓存互不影响
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        for resolution in resolutions:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                results.update(pool.submit(bench_scene, name, resolution).result())
+            print(f"[bench] {name}@{resolution}: {results[f'{name}@{resolution}']['wall']:.2f}s")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """返回超出基线 (1 + tolerance) 倍的指标列表"""
+    regressions = []
+    for key, metrics in results.items():
+        base = baseline.get(key, {})
+        for metric in COMPARED:
+            if metric in metrics and base.get(metric, 0) > 0 and metrics[metric] > base[metric] * (1 + tolerance):
+                regressions.append({"case": key, "metric": metric, "baseline": base[metric],
+                                    "current": metrics[metric], "ratio": metrics[metric] / base[metric]})
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dump_json(path, value):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(value, f, indent=1)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    from render_farm import SCENES
+
+    parser = argparse.ArgumentParser(description="Benchmark scene rendering and numeric engines")
+    parser.add_argument("scenes", nargs="*", help=f"scenes to render (default: all of {', '.join(SCENES)})")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), help="e.g. 480p15 720p30 1080p60")
+    parser.add_argument("--no-render", action="store_true", help="numeric micro-benchmarks only")
+    parser.add_argument("--no-micro", action="store_true", help="scene renders only")
+    parser.add_argument("--xgb-model", help="XGBoost JSON model for the SHAP micro-benchmark")
+    parser.add_argument("--t21-rows", type=int, default=1_000_000)
+    parser.add_argument("--shap-rows", type=int, default=10_000)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before flagging (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenes) - set(SCENES)
+    if unknown:
+        parser.error(f"unknown scene(s): {', '.join(sorted(unknown))}")
+    for spec in args.resolutions:
+        try:
+            parse_resolution(spec)
+        except ValueError:
+            parser.error(f"bad resolution {spec!r}, expected e.g. 720p30")
+
+    results = {}
+    if not args.no_micro:
+        results.update(run_micro(args.xgb_model, args.t21_rows, args.shap_rows))
+    if not args.no_render:
+        results.update(run_render(args.scenes or list(SCENES), args.resolutions))
+
+    baseline = _load_json(args.baseline, {}).get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+    run = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(),
+           "host": platform.node(), "results": results, "regressions": regressions}
+    _dump_json(args.history, _load_json(args.history, []) + [run])
+    if args.save_baseline:
+        _dump_json(args.baseline, {"commit": run["commit"], "timestamp": run["timestamp"], "results": results})
+
+    for key, metrics in results.items():
+        print(f"{key:60s} " + "  ".join(f"{k}={v:.4g}" for k, v in metrics.items()))
+    for r in regressions:
+        print(f"[regression] {r['case']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+              f"(x{r['ratio']:.2f})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,27 +1,80 @@
 from manim import *
 import numpy as np
 
+from async_writer import AsyncFileWriter
+import bio_engine
+import calibration
+import kinetic_live
+from decimate import decimate
+from frame_skip import FrameDiffMixin
+from keyframes import KeyframeMixin
+from profiling import ProfileMixin
+from render_cache import SectionCacheMixin
+from scene_template import TemplateMixin
+from text_cache import cached_text
+
+
+class BiochemAlgoViz(ProfileMixin, KeyframeMixin, FrameDiffMixin, TemplateMixin, SectionCacheMixin, Scene):
+    # 光栅化与编码并行 (encoder_pool 常驻编码进程)
+    file_writer_class = AsyncFileWriter
+    # 设置后从曲线库读取历史样本 (main / sub 通道)，否则使用模拟数据
+    store_path = None
+    sample_id = None
+    assay = None
+    # 模拟数据噪声的随机种子 (固定后段落缓存才能命中)
+    seed = 0
+    # 各方法使用的测试点 (Time)
+    endpoint_times = (50, 49)
+    fix_times = (20, 50)
+    kinetic_times = (30, 50)
+    kinetic_step = 2
+    # 曲线绘制顶点上限，None 表示按输出宽度 (每像素一列)
+    max_plot_points = None
+    # 定标点 (浓度, Rate A 斜率)；设置 reagent_lot 后按 (批号, 定标日期) 缓存拟合参数
+    calibrators = ((0, 50, 100, 200, 400, 800), (0.0005, 0.00479, 0.0080, 0.0125, 0.01764, 0.02232))
+    calibration_model = "4pl"
+    reagent_lot = None
+    calibration_date = None
+    # 定标时的 (样本量, 试剂量) μL；sample_vol 为本次样本量，None 表示与定标相同
+    calibration_volumes = (3.0, 200.0)
+    sample_vol = None
 
-class BiochemAlgoViz(Scene):
     def construct(self):
         # 1. 介绍场景
-        self.intro_scene()
+        self.cached_section(self.intro_scene)
 
         # 2. 数据预处理 (Main - Sub)
-        main_curve, sub_curve, final_curve, axes = self.data_process_scene()
+        # 降采样必须保留各方法的测试点，所以测试点参数也影响曲线绘制
+        plot_inputs = (self.endpoint_times, self.fix_times, self.kinetic_times, self.kinetic_step,
+                       self.max_plot_points)
+        main_curve, sub_curve, final_curve, axes = self.cached_section(
+            self.data_process_scene, inputs=(self.store_path, self.sample_id, self.assay, self.seed, plot_inputs),
+            deps=(self.create_axes_manual, self.demo_curves, self.plot_curve, self.key_indices,
+                  bio_engine.time_to_index))
 
         # 3. 算法可视化 - 终点法 (One Point End)
-        self.endpoint_method_scene(axes, final_curve)
+        self.cached_section(self.endpoint_method_scene, axes, final_curve, inputs=(final_curve, self.endpoint_times),
+                            deps=(bio_engine.one_point_end, bio_engine.time_to_index))
 
         # 4. 算法可视化 - 两点速率法 (Two Point Rate / Fix Time)
-        self.fix_time_method_scene(axes, final_curve)
+        self.cached_section(self.fix_time_method_scene, axes, final_curve, inputs=(final_curve, self.fix_times),
+                            deps=(bio_engine.fix_time, bio_engine.time_to_index))
 
         # 5. 算法可视化 - 动力学法 (Rate A / Kinetic)
-        self.kinetic_method_scene(axes, final_curve)
+        slope = self.cached_section(self.kinetic_method_scene, axes, final_curve,
+                                    inputs=(final_curve, self.kinetic_times, self.kinetic_step),
+                                    deps=(bio_engine.rate_a, bio_engine.time_to_index))
+
+        # 6. 定标曲线反算浓度
+        self.cached_section(self.calibration_scene, slope,
+                            inputs=(slope, self.calibrators, self.calibration_model, self.reagent_lot,
+                                    self.calibration_date, self.calibration_volumes, self.sample_vol),
+                            deps=(self.load_calibration, calibration.Calibration, calibration._f4pl,
+                                  calibration._fit_4pl, calibration._logit_log))
 
     def intro_scene(self):
-        title = Text("Biochemical Analysis Algorithms", font_size=40, color=BLUE).to_edge(UP)
-        subtitle = Text("Visualization of CHandleResultData.cpp", font_size=24, color=GRAY).next_to(title, DOWN)
+        title = cached_text("Biochemical Analysis Algorithms", font_size=40, color=BLUE).to_edge(UP)
+        subtitle = cached_text("Visualization of CHandleResultData.cpp", font_size=24, color=GRAY).next_to(title, DOWN)
         self.play(Write(title), FadeIn(subtitle))
         self.wait(1)
         self.play(FadeOut(subtitle))
@@ -42,54 +95,82 @@ class BiochemAlgoViz(Scene):
         # 手动添加 X 轴数字
         x_nums = VGroup()
         for x in range(0, 70, 10):
-            t = Text(str(x), font_size=16).next_to(axes.c2p(x, 0), DOWN)
+            t = cached_text(str(x), font_size=16).next_to(axes.c2p(x, 0), DOWN)
             x_nums.add(t)
 
         # 手动添加 Y 轴数字
         y_nums = VGroup()
         for y in [0, 0.5, 1.0, 1.5, 2.0, 2.5]:
-            t = Text(str(y), font_size=16).next_to(axes.c2p(0, y), LEFT)
+            t = cached_text(str(y), font_size=16).next_to(axes.c2p(0, y), LEFT)
             y_nums.add(t)
 
         # 手动添加标签
-        x_label = Text("Test Points (Time)", font_size=20).next_to(axes.x_axis, RIGHT)
-        y_label = Text("Absorbance", font_size=20).next_to(axes.y_axis, UP)
+        x_label = cached_text("Test Points (Time)", font_size=20).next_to(axes.x_axis, RIGHT)
+        y_label = cached_text("Absorbance", font_size=20).next_to(axes.y_axis, UP)
 
         return axes, x_nums, y_nums, x_label, y_label
 
-    def data_process_scene(self):
-        t_step1 = Text("Step 1: Dual Wavelength Correction", font_size=30, color=YELLOW).to_edge(UP).shift(DOWN * 1)
-        self.play(Transform(self.title, t_step1))
+    def key_indices(self, n_points):
+        """各方法场景会高亮的采样点，降采样时必须保留"""
+        start, end = bio_engine.time_to_index(self.kinetic_times, n_points)
+        times = bio_engine.time_to_index(self.endpoint_times + self.fix_times, n_points)
+        return np.concatenate([times, np.arange(start, end, self.kinetic_step)])
 
-        # 使用手动创建的坐标轴
-        axes, x_nums, y_nums, x_label, y_label = self.create_axes_manual()
-        self.play(Create(axes), Write(x_nums), Write(y_nums), Write(x_label), Write(y_label))
+    def plot_curve(self, axes, x_vals, y_vals, color):
+        """按屏幕分辨率降采样后绘制，长曲线的顶点数与插值开销不随读数增长"""
+        max_points = self.max_plot_points or config.pixel_width
+        idx = decimate(x_vals, y_vals, max_points, keep=self.key_indices(len(x_vals)))
+        return axes.plot_line_graph(x_vals[idx], np.asarray(y_vals)[idx], add_vertex_dots=False, line_color=color)
 
-        # 模拟数据
+    def demo_curves(self):
+        """模拟数据: (x, 主波长, 副波长)"""
         x_vals = np.linspace(0, 60, 100)
         # 主波长
-        y_main = 0.5 + 1.5 * (1 - np.exp(-0.05 * x_vals)) + 0.05 * np.random.normal(0, 0.1, 100)
+        rng = np.random.default_rng(self.seed)
+        y_main = 0.5 + 1.5 * (1 - np.exp(-0.05 * x_vals)) + 0.05 * rng.normal(0, 0.1, 100)
         # 副波长
         y_sub = 0.2 + 0.05 * np.sin(x_vals / 5)
+        return x_vals, y_main, y_sub
+
+    def data_process_scene(self):
+        t_step1 = cached_text("Step 1: Dual Wavelength Correction", font_size=30, color=YELLOW).to_edge(UP).shift(
+            DOWN * 1)
+        self.play(Transform(self.title, t_step1))
+
+        # 使用手动创建的坐标轴
+        axes, x_nums, y_nums, x_label, y_label = self.template(
+            "bio_axes", lambda: VGroup(*self.create_axes_manual()))
+        self.play(Create(axes), Write(x_nums), Write(y_nums), Write(x_label), Write(y_label))
 
-        graph_main = axes.plot_line_graph(x_vals, y_main, add_vertex_dots=False, line_color=BLUE)
-        graph_sub = axes.plot_line_graph(x_vals, y_sub, add_vertex_dots=False, line_color=RED)
+        if self.store_path is not None:
+            from curve_store import CurveStore
 
-        l_main = Text("Main Wave", color=BLUE, font_size=20).next_to(graph_main, UP).shift(RIGHT * 2)
-        l_sub = Text("Sub Wave", color=RED, font_size=20).next_to(graph_sub, DOWN).shift(RIGHT * 2)
+            store = CurveStore(self.store_path)
+            y_main = store.curve(self.sample_id, self.assay, "main")
+            y_sub = store.curve(self.sample_id, self.assay, "sub")
+            x_vals = np.linspace(0, 60, store.n_points)
+        else:
+            x_vals, y_main, y_sub = self.demo_curves()
+        self.x_vals = x_vals
+
+        graph_main = self.plot_curve(axes, x_vals, y_main, BLUE)
+        graph_sub = self.plot_curve(axes, x_vals, y_sub, RED)
+
+        l_main = cached_text("Main Wave", color=BLUE, font_size=20).next_to(graph_main, UP).shift(RIGHT * 2)
+        l_sub = cached_text("Sub Wave", color=RED, font_size=20).next_to(graph_sub, DOWN).shift(RIGHT * 2)
 
         self.play(Create(graph_main), Write(l_main))
         self.play(Create(graph_sub), Write(l_sub))
         self.wait(1)
 
         # 演示相减 (Text 替代 MathTex)
-        formula = Text("Abs_final = Abs_main - Abs_sub", font_size=24).to_corner(UR)
+        formula = cached_text("Abs_final = Abs_main - Abs_sub", font_size=24).to_corner(UR)
         self.play(Write(formula))
 
         # 计算差值曲线
         y_final = y_main - y_sub
-        graph_final = axes.plot_line_graph(x_vals, y_final, add_vertex_dots=False, line_color=GREEN)
-        l_final = Text("Corrected Curve", color=GREEN, font_size=20).next_to(graph_final, UP)
+        graph_final = self.plot_curve(axes, x_vals, y_final, GREEN)
+        l_final = cached_text("Corrected Curve", color=GREEN, font_size=20).next_to(graph_final, UP)
 
         self.play(
             Transform(graph_main, graph_final),
@@ -101,30 +182,31 @@ class BiochemAlgoViz(Scene):
         return graph_main, None, y_final, axes
 
     def endpoint_method_scene(self, axes, y_data):
-        t_info = Text("Method A: End Point (OnePointEnd)", font_size=30, color=GREEN).to_edge(UP).shift(DOWN * 1)
+        t_info = cached_text("Method A: End Point (OnePointEnd)", font_size=30, color=GREEN).to_edge(UP).shift(DOWN * 1)
         self.play(Transform(self.title, t_info))
 
         # 假设 Start Point = 50
-        x_idx_approx = 50
+        t_1, t_2 = self.endpoint_times
         # y_data是100个点对应0-60，所以索引大概是 50/60 * 100 = 83
-        val_1 = y_data[83]
-        val_2 = y_data[81]
+        idx_1, idx_2 = bio_engine.time_to_index(self.endpoint_times, len(y_data))
+        val_1 = y_data[idx_1]
+        val_2 = y_data[idx_2]
 
-        dot1 = Dot(axes.c2p(50, val_1), color=YELLOW)
-        dot2 = Dot(axes.c2p(49, val_2), color=YELLOW)
+        dot1 = Dot(axes.c2p(t_1, val_1), color=YELLOW)
+        dot2 = Dot(axes.c2p(t_2, val_2), color=YELLOW)
 
-        line_drop = DashedLine(dot1.get_center(), axes.c2p(50, 0), color=YELLOW)
-        label_point = Text("Start Point", font_size=20).next_to(line_drop, DOWN)
+        line_drop = DashedLine(dot1.get_center(), axes.c2p(t_1, 0), color=YELLOW)
+        label_point = cached_text("Start Point", font_size=20).next_to(line_drop, DOWN)
 
         self.play(FadeIn(dot1), FadeIn(dot2), Create(line_drop), Write(label_point))
 
         # 公式 (Text)
-        formula = Text("Result = (Abs(T) + Abs(T-1)) / 2", font_size=24).to_corner(UR)
+        formula = cached_text("Result = (Abs(T) + Abs(T-1)) / 2", font_size=24).to_corner(UR)
         self.play(Write(formula))
 
-        # 结果线
-        avg_val = (val_1 + val_2) / 2
-        res_line = Line(axes.c2p(0, avg_val), axes.c2p(50, avg_val), color=GREEN)
+        # 结果线 (与批量引擎同一算法)
+        avg_val = bio_engine.one_point_end(y_data, idx_1, idx_2)[0]
+        res_line = Line(axes.c2p(0, avg_val), axes.c2p(t_1, avg_val), color=GREEN)
         self.play(Create(res_line))
 
         self.wait(2)
@@ -132,19 +214,21 @@ class BiochemAlgoViz(Scene):
                   FadeOut(res_line))
 
     def fix_time_method_scene(self, axes, y_data):
-        t_info = Text("Method B: Two Point Rate (Fix Time)", font_size=30, color=ORANGE).to_edge(UP).shift(DOWN * 1)
+        t_info = cached_text("Method B: Two Point Rate (Fix Time)", font_size=30, color=ORANGE).to_edge(UP).shift(
+            DOWN * 1)
         self.play(Transform(self.title, t_info))
 
-        start_time = 20
-        end_time = 50
-        y_start = y_data[int(start_time / 60 * 100)]
-        y_end = y_data[int(end_time / 60 * 100)]
+        start_time, end_time = self.fix_times
+        idx_s, idx_e = bio_engine.time_to_index([start_time, end_time], len(y_data))
+        y_start = y_data[idx_s]
+        y_end = y_data[idx_e]
+        rate = bio_engine.fix_time(y_data, self.x_vals, idx_s, idx_e)[0]
 
         dot_s = Dot(axes.c2p(start_time, y_start), color=ORANGE)
         dot_e = Dot(axes.c2p(end_time, y_end), color=ORANGE)
 
-        l_s = Text("Start", font_size=16).next_to(dot_s, UP)
-        l_e = Text("End", font_size=16).next_to(dot_e, UP)
+        l_s = cached_text("Start", font_size=16).next_to(dot_s, UP)
+        l_e = cached_text("End", font_size=16).next_to(dot_e, UP)
 
         self.play(FadeIn(dot_s), FadeIn(dot_e), Write(l_s), Write(l_e))
 
@@ -155,41 +239,37 @@ class BiochemAlgoViz(Scene):
         line_dy = Line([dot_e.get_center()[0], dot_s.get_center()[1], 0], dot_e.get_center(), color=WHITE)
 
         # Text 替代 MathTex
-        label_dx = Text("Delta T", font_size=20).next_to(line_dx, DOWN)
-        label_dy = Text("Delta Abs", font_size=20).next_to(line_dy, RIGHT)
+        label_dx = cached_text("Delta T", font_size=20).next_to(line_dx, DOWN)
+        label_dy = cached_text("Delta Abs", font_size=20).next_to(line_dy, RIGHT)
 
         self.play(Create(line_dx), Create(line_dy), Write(label_dx), Write(label_dy))
 
-        formula = Text("Rate = (Delta Abs / Delta T) * 60", font_size=24).to_corner(UR)
-        note = Text("*Includes Volume Correction", font_size=16, color=GRAY).next_to(formula, DOWN)
+        formula = cached_text("Rate = (Delta Abs / Delta T) * 60", font_size=24).to_corner(UR)
+        note = cached_text("*Includes Volume Correction", font_size=16, color=GRAY).next_to(formula, DOWN)
+        result = Text(f"Rate = {rate:.4f}", font_size=20, color=ORANGE).next_to(note, DOWN)
 
-        self.play(Write(formula), FadeIn(note))
+        self.play(Write(formula), FadeIn(note), Write(result))
         self.wait(2)
 
         self.play(
-            FadeOut(Group(dot_s, dot_e, l_s, l_e, secant_line, line_dx, line_dy, label_dx, label_dy, formula, note)))
+            FadeOut(Group(dot_s, dot_e, l_s, l_e, secant_line, line_dx, line_dy, label_dx, label_dy, formula, note,
+                          result)))
 
     def kinetic_method_scene(self, axes, y_data):
-        t_info = Text("Method C: Kinetic (Rate A)", font_size=30, color=RED).to_edge(UP).shift(DOWN * 1)
+        t_info = cached_text("Method C: Kinetic (Rate A)", font_size=30, color=RED).to_edge(UP).shift(DOWN * 1)
         self.play(Transform(self.title, t_info))
 
-        start_idx = int(30 / 60 * 100)
-        end_idx = int(50 / 60 * 100)
+        start_idx, end_idx = bio_engine.time_to_index(self.kinetic_times, len(y_data))
+        step = self.kinetic_step
 
         dots = VGroup()
-        x_seg = []
-        y_seg = []
-
-        for i in range(start_idx, end_idx, 2):
-            x_val = i * 60 / 100
-            y_val = y_data[i]
-            x_seg.append(x_val)
-            y_seg.append(y_val)
-            dots.add(Dot(axes.c2p(x_val, y_val), color=RED, radius=0.05))
+        for i in range(start_idx, end_idx, step):
+            dots.add(Dot(axes.c2p(self.x_vals[i], y_data[i]), color=RED, radius=0.05))
 
         self.play(Create(dots))
 
-        slope, intercept = np.polyfit(x_seg, y_seg, 1)
+        slope, intercept = bio_engine.rate_a(y_data, self.x_vals, start_idx, end_idx, step)
+        slope, intercept = slope[0], intercept[0]
 
         x1, x2 = 25, 55
         y1 = slope * x1 + intercept
@@ -197,14 +277,143 @@ class BiochemAlgoViz(Scene):
 
         reg_line = Line(axes.c2p(x1, y1), axes.c2p(x2, y2), color=YELLOW, stroke_width=4)
 
-        lbl_lsq = Text("Least Squares Fit", font_size=24, color=YELLOW).next_to(reg_line, UP).rotate(0.2)
+        lbl_lsq = cached_text("Least Squares Fit", font_size=24, color=YELLOW).next_to(reg_line, UP).rotate(0.2)
 
         self.play(Create(reg_line), Write(lbl_lsq))
 
-        formula = Text("Slope = Sum((T-avgT)(A-avgA)) / Sum(T-avgT)^2", font_size=18).to_corner(UR)
+        formula = cached_text("Slope = Sum((T-avgT)(A-avgA)) / Sum(T-avgT)^2", font_size=18).to_corner(UR)
+        result = Text(f"Slope = {slope:.4f}", font_size=20, color=RED).next_to(formula, DOWN)
 
-        self.play(Write(formula))
+        self.play(Write(formula), Write(result))
+        self.wait(3)
+        return slope
+
+    def load_calibration(self):
+        """未设置 reagent_lot 时每次拟合演示定标点，否则同一批号同一定标日期只拟合一次"""
+        conc, signal = self.calibrators
+        sample_vol, reagent_vol = self.calibration_volumes
+        if self.reagent_lot is None:
+            return calibration.Calibration.fit(conc, signal, self.calibration_model, sample_vol=sample_vol,
+                                               reagent_vol=reagent_vol)
+        return calibration.CalibrationCache().get(self.reagent_lot, self.calibration_date, conc, signal,
+                                                  self.calibration_model, sample_vol=sample_vol,
+                                                  reagent_vol=reagent_vol)
+
+    def calibration_scene(self, signal):
+        t_info = cached_text("Calibration: Rate -> Concentration", font_size=30, color=PURPLE).to_edge(UP).shift(
+            DOWN * 1)
+        self.play(Transform(self.title, t_info), *[FadeOut(m) for m in self.mobjects if m is not self.title])
+
+        cal = self.load_calibration()
+        x_max = float(cal.conc.max())
+        y_max = float(max(cal.signal_points.max(), signal))
+        axes = Axes(
+            x_range=[0, x_max * 1.1, x_max / 4],
+            y_range=[0, y_max * 1.15, y_max / 4],
+            x_length=9, y_length=4.5,
+            axis_config={"include_tip": True, "include_numbers": False},
+        ).shift(DOWN * 0.7)
+        x_nums = VGroup(*[cached_text(f"{x:g}", font_size=16).next_to(axes.c2p(x, 0), DOWN)
+                          for x in np.linspace(0, x_max, 5)])
+        y_nums = VGroup(*[cached_text(f"{y:.3g}", font_size=16).next_to(axes.c2p(0, y), LEFT)
+                          for y in np.linspace(0, y_max, 5)])
+        x_label = cached_text("Concentration", font_size=20).next_to(axes.x_axis, RIGHT)
+        y_label = cached_text("Rate A", font_size=20).next_to(axes.y_axis, UP)
+        self.play(Create(axes), FadeIn(x_nums), FadeIn(y_nums), Write(x_label), Write(y_label))
+
+        dots = VGroup(*[Dot(axes.c2p(x, y), color=PURPLE) for x, y in zip(cal.conc, cal.signal_points)])
+        curve = axes.plot(lambda x: float(cal.signal(x)), x_range=[0, x_max * 1.1], color=YELLOW)
+        lot = "demo" if self.reagent_lot is None else f"lot {self.reagent_lot} ({self.calibration_date})"
+        formula = cached_text(f"{cal.model} fit, {lot}", font_size=20, color=YELLOW).to_corner(UR).shift(DOWN * 0.8)
+        self.play(Create(dots))
+        self.play(Create(curve), Write(formula))
+
+        # 样本信号 -> 水平线与曲线相交 -> 垂线落到浓度轴
+        conc = float(cal.inverse(signal))
+        sample_line = DashedLine(axes.c2p(0, signal), axes.c2p(x_max * 1.1, signal), color=RED)
+        self.play(Create(sample_line))
+        if np.isnan(conc):
+            result = Text(f"Rate = {signal:.4f}: out of calibration range", font_size=20, color=RED)
+            self.play(Write(result.next_to(formula, DOWN)))
+            self.wait(3)
+            return conc
+
+        hit = Dot(axes.c2p(conc, signal), color=RED)
+        drop = DashedLine(hit.get_center(), axes.c2p(conc, 0), color=RED)
+        self.play(sample_line.animate.put_start_and_end_on(axes.c2p(0, signal), hit.get_center()), FadeIn(hit))
+        self.play(Create(drop))
+
+        final = float(cal.concentration(signal, self.sample_vol))
+        lines = [f"Rate = {signal:.4f}", f"Conc = {conc:.1f}"]
+        if final != conc:
+            lines.append(f"Volume corrected = {final:.1f}")
+        result = VGroup(*[Text(line, font_size=20, color=RED) for line in lines]).arrange(
+            DOWN, aligned_edge=LEFT).next_to(formula, DOWN, aligned_edge=RIGHT)
+        self.play(Write(result))
         self.wait(3)
+        return final
+
+
+class KineticLiveViz(BiochemAlgoViz):
+    """实时动力学监测: 读数逐点到达时更新回归线与结果 (kinetic_live.LiveKinetics，每点 O(1))
+
+    feed 为 kinetic_live.open_feed 可接受的来源 (读数文件或 tcp://host:port)，为 None 时按模拟曲线回放。
+    配合 --renderer=opengl 预览窗口可在测量过程中实时观看。
+    """
+
+    feed = None
+    # 每个新读数停留的时长 (秒)
+    point_time = 0.1
+    # 底物耗尽的吸光度上限，None 表示只按斜率衰减判断
+    depletion_abs = None
+
+    def readings(self):
+        if self.feed is not None:
+            return kinetic_live.open_feed(self.feed)
+        x_vals, y_main, y_sub = self.demo_curves()
+        return zip(x_vals, y_main - y_sub)
+
+    def construct(self):
+        title = cached_text("Live Kinetic Monitor (Rate A)", font_size=30, color=RED).to_edge(UP).shift(DOWN * 1)
+        axes, x_nums, y_nums, x_label, y_label = self.template(
+            "bio_axes", lambda: VGroup(*self.create_axes_manual()))
+        self.add(title, axes, x_nums, y_nums, x_label, y_label)
+
+        kinetics = kinetic_live.LiveKinetics.from_times(
+            self.endpoint_times, self.fix_times, self.kinetic_times, self.kinetic_step,
+            depletion_abs=self.depletion_abs)
+        start, end, step = kinetics.kinetic
+        reg_line = result = VGroup()
+
+        for t, a, res in kinetic_live.monitor(self.readings(), kinetics):
+            i = res["index"]
+            in_window = start <= i < end and (i - start) % step == 0
+            self.add(Dot(axes.c2p(t, a), color=RED if in_window else BLUE, radius=0.05 if in_window else 0.03))
+
+            if res["rate_a"] is not None:
+                x1, x2 = self.kinetic_times[0] - 5, self.kinetic_times[1] + 5
+                y1 = res["rate_a"] * x1 + res["rate_a_intercept"]
+                y2 = res["rate_a"] * x2 + res["rate_a_intercept"]
+                self.remove(reg_line)
+                reg_line = Line(axes.c2p(x1, y1), axes.c2p(x2, y2), color=YELLOW, stroke_width=4)
+                self.add(reg_line)
+
+            lines = [f"t = {t:.1f}  Abs = {a:.4f}"]
+            if res["rate_a"] is not None:
+                lines.append(f"Slope = {res['rate_a']:.4f}  (n = {res['n_kinetic']}, R2 = {res['r2']:.3f})")
+            if res["fix_time"] is not None:
+                lines.append(f"Rate = {res['fix_time']:.4f}" + ("" if res["fix_time_final"] else " (provisional)"))
+            if res["endpoint"] is not None:
+                lines.append(f"End Point = {res['endpoint']:.4f}")
+            if res["flags"]:
+                lines.append("Warning: " + ", ".join(res["flags"]))
+            self.remove(result)
+            result = VGroup(*[Text(line, font_size=18, color=RED if line.startswith("Warning") else WHITE)
+                              for line in lines]).arrange(DOWN, aligned_edge=LEFT).to_corner(UR)
+            self.add(result)
+            self.wait(self.point_time)
+
+        self.wait(2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+# 与 bio.py 演示数据一致：100 个采样点覆盖 0-60 个测试点
+DEMO_N_POINTS = 100
+DEMO_X_MAX = 60
+
+
+def time_to_index(t, n_points=DEMO_N_POINTS, x_max=DEMO_X_MAX):
+    """测试点时间 -> 采样索引 (与场景中 int(t / 60 * 100) 相同)"""
+    return (np.asarray(t, dtype=float) / x_max * n_points).astype(np.intp)
+
+
+def _as_matrix(absorbance):
+    a = np.asarray(absorbance, dtype=float)
+    if a.ndim == 1:
+        a = a[None, :]
+    return a
+
+
+def _per_sample(idx, n_samples):
+    return np.broadcast_to(np.asarray(idx, dtype=np.intp), (n_samples,))
+
+
+def one_point_end(absorbance, point, prev_point):
+    """终点法 OnePointEnd: Result = (Abs(T) + Abs(T-1)) / 2
+
+    absorbance: (N_samples, N_points) 吸光度矩阵
+    point / prev_point: 标量或 (N_samples,) 的采样索引
+    """
+    a = _as_matrix(absorbance)
+    rows = np.arange(a.shape[0])
+    p = _per_sample(point, a.shape[0])
+    q = _per_sample(prev_point, a.shape[0])
+    return (a[rows, p] + a[rows, q]) / 2
+
+
+def fix_time(absorbance, x, start, end, scale=60.0):
+    """两点速率法 Fix Time: Rate = (Delta Abs / Delta T) * 60"""
+    a = _as_matrix(absorbance)
+    x = np.asarray(x, dtype=float)
+    rows = np.arange(a.shape[0])
+    s = _per_sample(start, a.shape[0])
+    e = _per_sample(end, a.shape[0])
+    return (a[rows, e] - a[rows, s]) / (x[e] - x[s]) * scale
+
+
+def _window_mask(n_samples, n_points, start, end, step):
+    cols = np.arange(n_points)[None, :]
+    s = _per_sample(start, n_samples)[:, None]
+    e = _per_sample(end, n_samples)[:, None]
+    step = _per_sample(step, n_samples)[:, None]
+    return (cols >= s) & (cols < e) & ((cols - s) % step == 0)
+
+
+def rate_a(absorbance, x, start, end, step=1):
+    """动力学法 Rate A: 窗口 [start, end) 内每隔 step 个点做最小二乘
+
+    闭式解一次算完所有样本，不逐条调用 np.polyfit:
+        Slope = Sum((T-avgT)(A-avgA)) / Sum(T-avgT)^2
+    返回 (slope, intercept)，均为 (N_samples,)。
+    """
+    a = _as_matrix(absorbance)
+    x = np.asarray(x, dtype=float)
+    w = _window_mask(a.shape[0], a.shape[1], start, end, step).astype(float)
+
+    n = w.sum(axis=1)
+    avg_t = (w * x).sum(axis=1) / n
+    avg_a = (w * a).sum(axis=1) / n
+    dt = (x[None, :] - avg_t[:, None]) * w
+    da = a - avg_a[:, None]
+    slope = (dt * da).sum(axis=1) / (dt * dt).sum(axis=1)
+    intercept = avg_a - slope * avg_t
+    return slope, intercept
+
+
+def run_batch(absorbance, x, endpoint, fix, kinetic):
+    """一次调用计算全部样本的三种方法结果
+
+    endpoint: (point, prev_point)
+    fix:      (start, end)
+    kinetic:  (start, end, step)
+    """
+    slope, intercept = rate_a(absorbance, x, *kinetic)
+    return {
+        "endpoint": one_point_end(absorbance, *endpoint),
+        "fix_time": fix_time(absorbance, x, *fix),
+        "rate_a": slope,
+        "rate_a_intercept": intercept,
+    }
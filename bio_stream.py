@@ -0,0 +1,74 @@
+import csv
+import itertools
+
+import numpy as np
+
+import bio_engine
+
+
+def iter_csv_chunks(path, chunk_rows=4096):
+    """按块读取分析仪 CSV 导出: 每行 sample_id, v0, v1, ..., vN
+
+    每次只持有 chunk_rows 行，yield (ids, (rows, N_points) float 矩阵)。
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                return
+            ids = np.array([r[0] for r in rows])
+            values = np.array([r[1:] for r in rows], dtype=np.float64)
+            yield ids, values
+
+
+def iter_binary_chunks(path, n_points, chunk_rows=4096, dtype=np.float32):
+    """按块读取二进制导出: 连续的定长 float 曲线，没有 ID，ID 即行号"""
+    row_bytes = np.dtype(dtype).itemsize * n_points
+    with open(path, "rb") as f:
+        start = 0
+        while True:
+            buf = f.read(row_bytes * chunk_rows)
+            if not buf:
+                return
+            if len(buf) % row_bytes:
+                raise ValueError(f"{path}: truncated record at row {start + len(buf) // row_bytes}")
+            values = np.frombuffer(buf, dtype=dtype).reshape(-1, n_points)
+            yield np.arange(start, start + len(values)), values
+            start += len(values)
+
+
+def iter_aligned(main_chunks, sub_chunks):
+    """同步遍历主/副波长两个导出，检查行对齐，yield (ids, main, sub)"""
+    for (ids, main), (sub_ids, sub) in zip(main_chunks, sub_chunks, strict=True):
+        if len(ids) != len(sub_ids) or np.any(ids != sub_ids):
+            raise ValueError("main / sub wavelength exports are not aligned")
+        yield ids, main, sub
+
+
+def iter_corrected(main_chunks, sub_chunks):
+    """双波长校正: Abs_final = Abs_main - Abs_sub，逐块进行"""
+    for ids, main, sub in iter_aligned(main_chunks, sub_chunks):
+        yield ids, main - sub
+
+
+def open_chunks(path, n_points=None, chunk_rows=4096):
+    """根据扩展名选择读取方式 (.csv 为文本，其余按 float32 二进制处理)"""
+    if str(path).endswith(".csv"):
+        return iter_csv_chunks(path, chunk_rows)
+    if n_points is None:
+        raise ValueError("n_points is required for binary dumps")
+    return iter_binary_chunks(path, n_points, chunk_rows)
+
+
+def stream_results(main_path, sub_path, x, endpoint, fix, kinetic, chunk_rows=4096):
+    """流式计算: 读取 -> 校正 -> 终点法 / 两点速率法 / 动力学法
+
+    内存占用只取决于 chunk_rows，与导出文件大小无关。
+    每块 yield (ids, bio_engine.run_batch 结果字典)。
+    """
+    n_points = len(x)
+    corrected = iter_corrected(open_chunks(main_path, n_points, chunk_rows),
+                               open_chunks(sub_path, n_points, chunk_rows))
+    for ids, y_final in corrected:
+        yield ids, bio_engine.run_batch(y_final, x, endpoint, fix, kinetic)
@@ -0,0 +1,203 @@
+"""标志物缺失值预处理: Count(Biomarkers) > 1 筛选
+
+示例:
+    python biomarker_filter.py registry.csv out/registry --markers CA199 CEA CA125 AFP
+生成 out/registry.clean.csv (保留的行) 与 out/registry.dropped.csv (剔除的行及原因)。
+"""
+import argparse
+import csv
+import itertools
+import os
+
+import numpy as np
+
+ID_COLUMN = "ID"
+MARKERS = ("CA199", "CEA", "CA125")
+# 样本至少要有这么多个有效标志物才保留 (Count(Biomarkers) > 1)
+MIN_VALID = 2
+
+
+# 视为缺失的文本 (自动识别数值列时允许出现)
+MISSING = ("", "NA", "N/A", "NaN", "nan", "null", "NULL", "None")
+
+
+def _to_float(values):
+    values = np.asarray(values, dtype=str)
+    try:
+        return values.astype(float)
+    except ValueError:
+        pass
+    # 慢路径: 空串 / "NA" 等无法解析的值一律视为缺失
+    out = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except ValueError:
+            pass
+    return out
+
+
+def _as_float(values):
+    """标志物列转 float; 文本列中无法解析的值 (如 "<0.6") 视为缺失，与 run() 的筛选一致"""
+    values = np.asarray(values)
+    return values if values.dtype.kind == "f" else _to_float(values)
+
+
+def _is_numeric(values):
+    """除缺失标记外全部能解析为数值"""
+    for v in values:
+        if v in MISSING:
+            continue
+        try:
+            float(v)
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def check_markers(headers, markers=MARKERS):
+    """标志物列必须都在表头里，否则场景与批处理的筛选结果会不一致"""
+    missing = [m for m in markers if m not in headers]
+    if missing:
+        raise ValueError(f"biomarker column(s) missing from table: {', '.join(missing)}")
+    return list(markers)
+
+
+def from_rows(headers, rows, numeric=None):
+    """行式数据 -> (表头, 列字典)
+
+    numeric 中的列转 float (缺失为 NaN)，其余列保持原始字符串; numeric 为 None 时
+    除 ID 列外能整列解析为数值的列都转 float (模型特征)，文本列原样保留。
+    """
+    columns = {}
+    for i, h in enumerate(headers):
+        values = [row[i] for row in rows]
+        if numeric is None:
+            convert = h != ID_COLUMN and _is_numeric(values)
+        else:
+            convert = h in numeric
+        columns[h] = _to_float(values) if convert else np.array(values, dtype=str)
+    return list(headers), columns
+
+
+def read_table(source, markers=MARKERS):
+    """读取整张患者表: CSV 路径或 pandas DataFrame (鸭子类型，不强制依赖 pandas)
+
+    表中存在的 markers 列总是转成 float，含 "<0.6" 之类文本的标志物列不会整列变成字符串。
+    """
+    if hasattr(source, "columns") and hasattr(source, "to_numpy"):
+        headers = [str(c) for c in source.columns]
+        rows = [["" if v is None or (isinstance(v, float) and np.isnan(v)) else str(v) for v in row]
+                for row in source.astype(object).to_numpy().tolist()]
+    else:
+        with open(source, newline="") as f:
+            reader = csv.reader(f)
+            headers = next(reader)
+            rows = list(reader)
+    headers, columns = from_rows(headers, rows)
+    for m in markers:
+        if m in columns:
+            columns[m] = _as_float(columns[m])
+    return headers, columns
+
+
+def iter_csv_chunks(path, chunk_rows=65536, numeric=None):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                return
+            yield from_rows(headers, rows, numeric)
+
+
+def iter_parquet_chunks(path, chunk_rows=65536, numeric=None):
+    """numeric 同 from_rows; 为 None 时按列的 Arrow 类型判断，非数值列原样传出"""
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    headers = parquet.schema_arrow.names
+    for batch in parquet.iter_batches(batch_size=chunk_rows):
+        columns = {}
+        for h, col in zip(headers, batch.columns):
+            values = col.to_numpy(zero_copy_only=False)
+            if h == ID_COLUMN:
+                columns[h] = values.astype(str)
+            elif numeric is None or h in numeric:
+                if values.dtype.kind in "biuf":
+                    columns[h] = values.astype(float)
+                elif numeric is not None:
+                    columns[h] = _to_float(["" if v is None else str(v) for v in values])
+                else:
+                    columns[h] = values
+            else:
+                columns[h] = values
+        yield list(headers), columns
+
+
+def iter_chunks(path, chunk_rows=65536, numeric=None):
+    """按块读取 CSV / Parquet，每块 yield (表头, 列字典)"""
+    if str(path).endswith((".parquet", ".pq")):
+        return iter_parquet_chunks(path, chunk_rows, numeric)
+    return iter_csv_chunks(path, chunk_rows, numeric)
+
+
+def valid_counts(columns, markers=MARKERS):
+    """每行有效 (非 NaN) 标志物个数，整列向量化计算"""
+    values = np.column_stack([_as_float(columns[m]) for m in markers])
+    return np.count_nonzero(~np.isnan(values), axis=1)
+
+
+def preprocess(columns, markers=MARKERS, min_valid=MIN_VALID):
+    """筛选一块数据，返回 keep 掩码、有效个数与逐行剔除原因 (保留的行为空串)
+
+    场景与模型输入都经过这里，保证展示的与送入模型的一致。
+    """
+    counts = valid_counts(columns, markers)
+    keep = counts >= min_valid
+    reasons = np.where(keep, "", np.char.add(f"valid biomarkers < {min_valid}: ", counts.astype(str)))
+    return {"keep": keep, "counts": counts, "reasons": reasons}
+
+
+def _write_rows(writer, headers, columns, rows, extra=()):
+    cols = [columns[h] for h in headers] + list(extra)
+    for r in rows:
+        writer.writerow([c[r] for c in cols])
+
+
+def run(path, output_prefix, markers=MARKERS, min_valid=MIN_VALID, chunk_rows=65536):
+    """流式预处理整个文件，内存只取决于 chunk_rows; 返回计数汇总"""
+    os.makedirs(os.path.dirname(output_prefix) or ".", exist_ok=True)
+    total = kept = 0
+    with open(f"{output_prefix}.clean.csv", "w", newline="") as f_clean, \
+            open(f"{output_prefix}.dropped.csv", "w", newline="") as f_drop:
+        clean, drop = csv.writer(f_clean), csv.writer(f_drop)
+        # 各列按原始文本读入并原样写入 clean.csv，只有标志物列转成数值用于筛选
+        for i, (headers, columns) in enumerate(iter_chunks(path, chunk_rows, numeric=())):
+            if i == 0:
+                check_markers(headers, markers)
+                clean.writerow(headers)
+                drop.writerow([ID_COLUMN, "count", "reason"])
+            result = preprocess(columns, markers, min_valid)
+            ids = columns.get(ID_COLUMN, np.arange(total, total + len(result["keep"])).astype(str))
+            _write_rows(clean, headers, columns, np.flatnonzero(result["keep"]))
+            _write_rows(drop, [], {}, np.flatnonzero(~result["keep"]), (ids, result["counts"], result["reasons"]))
+            total += len(result["keep"])
+            kept += int(result["keep"].sum())
+    return {"rows": total, "kept": kept, "dropped": total - kept}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drop samples with too few valid biomarkers")
+    parser.add_argument("input", help="CSV or Parquet patient table")
+    parser.add_argument("output_prefix")
+    parser.add_argument("--markers", nargs="+", default=list(MARKERS))
+    parser.add_argument("--min-valid", type=int, default=MIN_VALID)
+    parser.add_argument("--chunk-rows", type=int, default=65536)
+    args = parser.parse_args(argv)
+    print(run(args.input, args.output_prefix, tuple(args.markers), args.min_valid, args.chunk_rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""批量定标: 每个试剂批号拟合一次定标曲线，整批结果向量化反算浓度 (含样本 / 试剂体积校正)
+
+示例:
+    python calibration.py cal.csv results.csv --lot L2301 --date 2026-10-18 --model 4pl
+    cal.csv: conc,signal 两列; results.csv: signal 列，可选 id / sample_vol / reagent_vol / dilution 列
+拟合参数按 (批号, 定标日期) 缓存在 CALIBRATION_CACHE，同一批号的后续批次直接读取。
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_PATH = os.environ.get(
+    "CALIBRATION_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "manim_bioAlg", "calibration.json"))
+MODELS = ("linear", "poly", "4pl", "logit_log")
+# 多项式反算用的查表点数 (覆盖 0 到最高定标点浓度)
+_INVERSE_GRID = 4096
+# CSV 中按数值读取的列，其余列 (样本 ID 等) 保持字符串
+NUMERIC_COLUMNS = ("conc", "signal", "sample_vol", "reagent_vol", "dilution")
+ID_COLUMNS = ("id", "ID", "sample_id")
+
+
+def volume_factor(sample_vol, reagent_vol, cal_sample_vol, cal_reagent_vol):
+    """样本 / 试剂体积与定标时不同时的浓度校正系数
+
+    反应液中样本所占比例变化: (V_s,cal / V_s) * ((V_s + V_r) / (V_s,cal + V_r,cal))
+    """
+    sample_vol = np.asarray(sample_vol, dtype=float)
+    reagent_vol = np.asarray(reagent_vol, dtype=float)
+    return cal_sample_vol / sample_vol * (sample_vol + reagent_vol) / (cal_sample_vol + cal_reagent_vol)
+
+
+def _f4pl(x, a, b, c, d):
+    """4PL: y = d + (a - d) / (1 + (x / c)^b)，a 为零浓度信号，d 为无穷大浓度信号"""
+    return d + (a - d) / (1.0 + (np.asarray(x, dtype=float) / c) ** b)
+
+
+def _jac_4pl(x, a, b, c, d):
+    u = (x / c) ** b
+    den = 1.0 + u
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_xc = np.where(x > 0, np.log(np.where(x > 0, x, 1.0) / c), 0.0)
+    return np.column_stack([1.0 / den, -(a - d) * u * log_xc / den ** 2, (a - d) * b * u / (c * den ** 2),
+                            u / den])
+
+
+def _logit_log(x, y):
+    """logit-log 线性化: logit((y - a) / (d - a)) = b ln x - b ln c，a 取零浓度信号，d 在最大信号外推 5%"""
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+    a = y[0] if x[0] == 0 else y[0] - 0.05 * (y[-1] - y[0])
+    d = y[-1] + 0.05 * (y[-1] - y[0])
+    p = (y - a) / (d - a)
+    inside = (x > 0) & (p > 0) & (p < 1)
+    if inside.sum() < 2:
+        raise ValueError("logit-log needs at least two calibrators strictly between blank and plateau")
+    b, intercept = np.polyfit(np.log(x[inside]), np.log(p[inside] / (1 - p[inside])), 1)
+    return np.array([a, b, np.exp(-intercept / b), d])
+
+
+def _fit_4pl(x, y, iters=200):
+    """Levenberg-Marquardt，初值取 logit-log 线性化结果"""
+    p = _logit_log(x, y)
+    r = _f4pl(x, *p) - y
+    cost = r @ r
+    lam = 1e-3
+    for _ in range(iters):
+        jac = _jac_4pl(x, *p)
+        hess = jac.T @ jac
+        step = np.linalg.solve(hess + lam * np.diag(np.diag(hess) + 1e-12), -(jac.T @ r))
+        trial = p + step
+        if trial[2] <= 0:
+            lam *= 10
+            continue
+        r_trial = _f4pl(x, *trial) - y
+        if r_trial @ r_trial < cost:
+            p, r, cost = trial, r_trial, r_trial @ r_trial
+            lam = max(lam / 10, 1e-12)
+            if np.all(np.abs(step) <= 1e-10 * (np.abs(p) + 1e-10)):
+                break
+        else:
+            lam *= 10
+            if lam > 1e12:
+                break
+    return p
+
+
+class Calibration:
+    """一个试剂批号的定标曲线: 浓度 -> 信号 (吸光度或速率)
+
+    拟合只在 fit() 时做一次; concentration() 对整批信号向量化反算，不再拟合。
+    linear / poly 的参数为 np.polyval 系数，4pl / logit_log 为 (a, b, c, d)。
+    反算时各模型一致: 空白一侧 (不高于零浓度信号) 记为 0，即低于检测限;
+    超出曲线可达上限 (4PL 平台、多项式最高定标点) 为 NaN; 线性模型向上线性外推。
+    """
+
+    def __init__(self, model, params, conc, signal, sample_vol=None, reagent_vol=None):
+        if model not in MODELS:
+            raise ValueError(f"unknown calibration model {model!r}, expected one of {MODELS}")
+        self.model = model
+        self.params = np.asarray(params, dtype=float)
+        self.conc = np.asarray(conc, dtype=float)
+        self.signal_points = np.asarray(signal, dtype=float)
+        self.sample_vol = sample_vol
+        self.reagent_vol = reagent_vol
+        if model == "poly":
+            self._grid = np.linspace(0, self.conc.max(), _INVERSE_GRID)
+            values = np.polyval(self.params, self._grid)
+            if not (np.all(np.diff(values) > 0) or np.all(np.diff(values) < 0)):
+                raise ValueError("polynomial calibration is not monotonic between zero and the top calibrator")
+            # np.interp 需要递增的 x
+            self._order = slice(None) if values[-1] > values[0] else slice(None, None, -1)
+            self._grid_values = values
+
+    @classmethod
+    def fit(cls, conc, signal, model="linear", degree=2, sample_vol=None, reagent_vol=None):
+        conc = np.asarray(conc, dtype=float)
+        signal = np.asarray(signal, dtype=float)
+        if model == "linear":
+            params = np.polyfit(conc, signal, 1)
+        elif model == "poly":
+            params = np.polyfit(conc, signal, degree)
+        elif model == "4pl":
+            params = _fit_4pl(conc, signal)
+        elif model == "logit_log":
+            params = _logit_log(conc, signal)
+        else:
+            raise ValueError(f"unknown calibration model {model!r}, expected one of {MODELS}")
+        return cls(model, params, conc, signal, sample_vol, reagent_vol)
+
+    def signal(self, conc):
+        """正向: 浓度 -> 信号"""
+        if self.model in ("linear", "poly"):
+            return np.polyval(self.params, np.asarray(conc, dtype=float))
+        return _f4pl(conc, *self.params)
+
+    def inverse(self, signal):
+        """反算: 信号 -> 浓度; 空白一侧为 0，超出曲线上限为 NaN"""
+        y = np.asarray(signal, dtype=float)
+        if self.model == "linear":
+            slope, intercept = self.params
+            return np.maximum((y - intercept) / slope, 0.0)
+        if self.model == "poly":
+            increasing = self._grid_values[-1] > self._grid_values[0]
+            xs, ys = self._grid[self._order], self._grid_values[self._order]
+            return np.interp(y, ys, xs, left=0.0 if increasing else np.nan, right=np.nan if increasing else 0.0)
+        a, b, c, d = self.params
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (a - d) / (y - d) - 1.0
+            x = c * np.where(ratio >= 0, ratio, np.nan) ** (1.0 / b)
+        # 信号与平台 d 同侧越过 a 之外为空白一侧; 越过 d 的 NaN 保留
+        blank_side = (y - a) * (d - a) <= 0
+        return np.where(blank_side, 0.0, x)
+
+    def concentration(self, signal, sample_vol=None, reagent_vol=None, dilution=1.0):
+        """整批结果的最终浓度 = 反算浓度 x 体积校正 x 稀释倍数
+
+        sample_vol / reagent_vol 为 None 时视为与定标相同; 定标未记录体积时不能做体积校正。
+        """
+        conc = self.inverse(signal)
+        if sample_vol is not None or reagent_vol is not None:
+            if self.sample_vol is None or self.reagent_vol is None:
+                raise ValueError("volume correction requested but the calibration has no sample/reagent volumes")
+            sample_vol = self.sample_vol if sample_vol is None else sample_vol
+            reagent_vol = self.reagent_vol if reagent_vol is None else reagent_vol
+            conc = conc * volume_factor(sample_vol, reagent_vol, self.sample_vol, self.reagent_vol)
+        return conc * np.asarray(dilution, dtype=float)
+
+    def to_dict(self):
+        return {"model": self.model, "params": self.params.tolist(), "conc": self.conc.tolist(),
+                "signal": self.signal_points.tolist(), "sample_vol": self.sample_vol, "reagent_vol": self.reagent_vol}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["model"], d["params"], d["conc"], d["signal"], d.get("sample_vol"), d.get("reagent_vol"))
+
+
+def _data_hash(conc, signal, model, degree, sample_vol, reagent_vol):
+    h = hashlib.sha1()
+    for arr in (conc, signal):
+        h.update(np.ascontiguousarray(arr, dtype=float).tobytes())
+    h.update(repr((model, degree, sample_vol, reagent_vol)).encode())
+    return h.hexdigest()
+
+
+class CalibrationCache:
+    """按 (试剂批号, 定标日期) 缓存拟合参数的 JSON 文件
+
+    同一批号同一天的定标点不变时直接读参数; 定标点或模型变化 (重新定标) 时才重新拟合并写回。
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._entries = None
+        self._loaded = {}
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+        return self._entries
+
+    def get(self, lot, date, conc, signal, model="linear", degree=2, sample_vol=None, reagent_vol=None):
+        key = f"{lot}|{date}"
+        digest = _data_hash(conc, signal, model, degree, sample_vol, reagent_vol)
+        if key in self._loaded and self._loaded[key][0] == digest:
+            return self._loaded[key][1]
+        entry = self._load().get(key)
+        if entry is not None and entry["hash"] == digest:
+            calibration = Calibration.from_dict(entry)
+        else:
+            calibration = Calibration.fit(conc, signal, model, degree, sample_vol, reagent_vol)
+            self._entries[key] = {**calibration.to_dict(), "hash": digest}
+            self._save()
+        self._loaded[key] = (digest, calibration)
+        return calibration
+
+    def lookup(self, lot, date):
+        """只读已缓存的定标，没有时返回 None"""
+        entry = self._load().get(f"{lot}|{date}")
+        return None if entry is None else Calibration.from_dict(entry)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def apply_by_lot(signal, lots, calibrations, sample_vol=None, reagent_vol=None, dilution=1.0):
+    """一批结果可能来自多个批号: 每个批号的样本一次向量化反算
+
+    lots: (N,) 每个结果的批号; calibrations: 批号 -> Calibration
+    """
+    signal = np.asarray(signal, dtype=float)
+    lots = np.asarray(lots)
+    out = np.full(signal.shape, np.nan)
+    sample_vol = None if sample_vol is None else np.broadcast_to(sample_vol, signal.shape)
+    reagent_vol = None if reagent_vol is None else np.broadcast_to(reagent_vol, signal.shape)
+    dilution = np.broadcast_to(np.asarray(dilution, dtype=float), signal.shape)
+    for lot in np.unique(lots):
+        rows = lots == lot
+        out[rows] = calibrations[lot].concentration(
+            signal[rows], None if sample_vol is None else sample_vol[rows],
+            None if reagent_vol is None else reagent_vol[rows], dilution[rows])
+    return out
+
+
+def _read_columns(path):
+    """CSV -> 列字典; 只有 NUMERIC_COLUMNS 转 float，其余列保持字符串"""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return {}
+    return {k: np.array([float(r[k]) for r in rows]) if k in NUMERIC_COLUMNS else np.array([r[k] for r in rows])
+            for k in rows[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert signals to concentrations with a cached lot calibration")
+    parser.add_argument("calibrators", help="CSV with conc,signal columns")
+    parser.add_argument("results", help="CSV with a signal column and optional id / sample_vol / reagent_vol / "
+                                        "dilution columns")
+    parser.add_argument("--lot", required=True)
+    parser.add_argument("--date", required=True, help="calibration date")
+    parser.add_argument("--model", choices=MODELS, default="linear")
+    parser.add_argument("--degree", type=int, default=2, help="polynomial degree for --model poly")
+    parser.add_argument("--volumes", type=float, nargs=2, metavar=("SAMPLE", "REAGENT"),
+                        help="sample / reagent volumes used at calibration")
+    parser.add_argument("--output", help="write id,signal,conc to this CSV instead of stdout")
+    args = parser.parse_args(argv)
+
+    cal = _read_columns(args.calibrators)
+    results = _read_columns(args.results)
+    if not args.volumes and ("sample_vol" in results or "reagent_vol" in results):
+        parser.error("results contain sample_vol / reagent_vol columns; --volumes is required to correct them")
+    sample_vol, reagent_vol = args.volumes or (None, None)
+    calibration = CalibrationCache().get(args.lot, args.date, cal["conc"], cal["signal"], args.model, args.degree,
+                                         sample_vol, reagent_vol)
+    conc = calibration.concentration(results["signal"], results.get("sample_vol"), results.get("reagent_vol"),
+                                     results.get("dilution", 1.0))
+    id_column = next((c for c in ID_COLUMNS if c in results), None)
+    ids = results[id_column] if id_column else np.arange(1, len(conc) + 1).astype(str)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([id_column or "row", "signal", "conc"])
+            writer.writerows(zip(ids, results["signal"], conc))
+    else:
+        for sample, signal, value in zip(ids, results["signal"], conc):
+            print(f"{sample}  {signal:.6g}  {value:.4g}")
+    # NaN 为超出定标上限，需要稀释重测
+    return 0 if not np.isnan(conc).any() else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
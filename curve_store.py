@@ -0,0 +1,143 @@
+import json
+import os
+
+import numpy as np
+
+import bio_stream
+
+# 每个通道单独一组文件，批量计算按通道读取时每块都是连续的 memmap 切片
+CHANNELS = ("main", "sub", "final")
+# 索引记录: 第 i 条记录对应同一通道 curves 文件的第 i 行
+INDEX_DTYPE = np.dtype([
+    ("sample_id", "<U32"),
+    ("assay", "<U16"),
+    ("timestamp", "<M8[s]"),
+])
+CURVE_DTYPE = np.dtype("<f4")
+
+
+class CurveStore:
+    """定长 float32 内存映射曲线库 + 按 sample_id 排序的索引，每个通道 (main / sub / final) 各一份
+
+    目录结构:
+        meta.json              {"n_points": N}
+        curves.<channel>.f32   (n_curves, N) 连续 float32
+        index.<channel>.bin    INDEX_DTYPE 定长记录
+    数据文件都只追加，读取通过 np.memmap，多个进程共享同一份页缓存且不复制。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.n_points = json.load(f)["n_points"]
+        self.index = {}
+        self.curves = {}
+        self._order = {}
+        for channel in CHANNELS:
+            self._load(channel)
+
+    @classmethod
+    def create(cls, path, n_points):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"n_points": int(n_points)}, f)
+        for channel in CHANNELS:
+            for name in (f"curves.{channel}.f32", f"index.{channel}.bin"):
+                open(os.path.join(path, name), "wb").close()
+        return cls(path)
+
+    def _file(self, kind, channel):
+        if channel not in CHANNELS:
+            raise ValueError(f"unknown channel {channel!r}, expected one of {', '.join(CHANNELS)}")
+        return os.path.join(self.path, f"{kind}.{channel}.{'f32' if kind == 'curves' else 'bin'}")
+
+    def _map(self, path, dtype, shape):
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def _load(self, channel):
+        # 以索引长度为准: 写入时先写曲线再写索引，中断时多出的半截曲线不会被读到，下次 append 时截掉
+        index_path = self._file("index", channel)
+        n = os.path.getsize(index_path) // INDEX_DTYPE.itemsize if os.path.exists(index_path) else 0
+        self.index[channel] = self._map(index_path, INDEX_DTYPE, (n,))
+        self.curves[channel] = self._map(self._file("curves", channel), CURVE_DTYPE, (n, self.n_points))
+        self._order.pop(channel, None)
+
+    def __len__(self):
+        return sum(len(index) for index in self.index.values())
+
+    def count(self, channel="final"):
+        return len(self.index[channel])
+
+    def _sorted(self, channel):
+        if channel not in self._order:
+            order = np.argsort(self.index[channel]["sample_id"], kind="stable")
+            self._order[channel] = order, self.index[channel]["sample_id"][order]
+        return self._order[channel]
+
+    def append(self, curves, sample_ids, assay, timestamp, channel="final"):
+        """追加一批曲线到 channel; assay / timestamp 可为标量或逐条数组"""
+        curves_path, index_path = self._file("curves", channel), self._file("index", channel)
+        curves = np.asarray(curves, dtype=CURVE_DTYPE)
+        if curves.ndim != 2 or curves.shape[1] != self.n_points:
+            raise ValueError(f"expected (n, {self.n_points}) curves, got {curves.shape}")
+        records = np.empty(len(curves), dtype=INDEX_DTYPE)
+        for field, values in (("sample_id", sample_ids), ("assay", assay)):
+            # 定长 Unicode 字段会静默截断，不同样本可能因此撞在一起
+            width = INDEX_DTYPE[field].itemsize // 4
+            too_long = np.char.str_len(np.asarray(values, dtype=str)) > width
+            if np.any(too_long):
+                example = str(np.atleast_1d(np.asarray(values, dtype=str))[np.atleast_1d(too_long)][0])
+                raise ValueError(f"{field} {example!r} is longer than {width} characters")
+            records[field] = values
+        records["timestamp"] = timestamp
+
+        # 从索引对应的位置写，覆盖上次中断留下的半截曲线，保证第 i 条索引对应第 i 行
+        # (追加模式下 write 总是写到截断后的文件末尾)
+        with open(curves_path, "ab") as f:
+            f.truncate(self.count(channel) * self.n_points * CURVE_DTYPE.itemsize)
+            f.write(curves.tobytes())
+        with open(index_path, "ab") as f:
+            f.write(records.tobytes())
+        self._load(channel)
+
+    def rows(self, sample_id, assay=None, channel="final"):
+        """channel 内按 sample_id (二分查找) 及可选 assay 过滤，返回按时间排序的行号"""
+        order, sorted_ids = self._sorted(channel)
+        lo = np.searchsorted(sorted_ids, sample_id, side="left")
+        hi = np.searchsorted(sorted_ids, sample_id, side="right")
+        rows = order[lo:hi]
+        if assay is not None:
+            rows = rows[self.index[channel]["assay"][rows] == assay]
+        return rows[np.argsort(self.index[channel]["timestamp"][rows], kind="stable")]
+
+    def curve(self, sample_id, assay, channel="final", timestamp=None):
+        """取单条曲线 (memmap 视图，不复制); 不指定 timestamp 时取最新一次"""
+        rows = self.rows(sample_id, assay, channel)
+        if timestamp is not None:
+            rows = rows[self.index[channel]["timestamp"][rows] == np.datetime64(timestamp, "s")]
+        if not len(rows):
+            raise KeyError((sample_id, assay, channel, timestamp))
+        return self.curves[channel][rows[-1]]
+
+    def iter_chunks(self, chunk_rows=4096, channel="final"):
+        """按连续行块遍历 channel，供批量计算使用; 每块 yield (行号, 曲线矩阵)，曲线矩阵是 memmap 切片 (不复制)"""
+        curves = self.curves[channel]
+        for start in range(0, len(curves), chunk_rows):
+            stop = min(start + chunk_rows, len(curves))
+            yield np.arange(start, stop), curves[start:stop]
+
+
+def ingest(store, main_path, sub_path, assay, timestamp, chunk_rows=4096, channels=CHANNELS):
+    """把分析仪导出流式写入曲线库，以后重算 / 重渲染不必再解析原始文件
+
+    BiochemAlgoViz 的曲线库模式读取 main / sub 两个通道，只存 final 时无法渲染。
+    """
+    n_points = store.n_points
+    aligned = bio_stream.iter_aligned(bio_stream.open_chunks(main_path, n_points, chunk_rows),
+                                      bio_stream.open_chunks(sub_path, n_points, chunk_rows))
+    for ids, main, sub in aligned:
+        curves = {"main": main, "sub": sub, "final": main - sub}
+        for channel in channels:
+            store.append(curves[channel], ids.astype(str), assay, timestamp, channel)
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def minmax_indices(y, n_bins):
+    """每个像素列 (bin) 保留最小值和最大值两个点，完全向量化"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * n_bins:
+        return np.arange(n)
+    width = -(-n // n_bins)
+    # 末尾用最后一个值补齐，使其可 reshape 成 (n_bins, width)
+    padded = np.pad(y, (0, width * n_bins - n), mode="edge").reshape(n_bins, width)
+    base = np.arange(n_bins) * width
+    idx = np.concatenate([base + padded.argmin(axis=1), base + padded.argmax(axis=1)])
+    return np.unique(np.clip(idx, 0, n - 1))
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的索引"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # 首尾各一个点，中间 n_out - 2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            cx, cy = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def decimate(x, y, max_points, keep=(), method="minmax"):
+    """把曲线降到 max_points 个点左右 (屏幕分辨率)，并强制保留 keep 中的索引
+
+    返回排序后的索引; 顶点数上限为 max_points + len(keep)。
+    """
+    n = len(x)
+    if method == "lttb":
+        idx = lttb_indices(x, y, max_points)
+    elif method == "minmax":
+        idx = minmax_indices(y, max(max_points // 2, 1))
+    else:
+        raise ValueError(f"unknown decimation method: {method}")
+    # 首尾两点总是保留，曲线范围不变
+    keep = np.append(np.asarray(keep, dtype=np.intp), [0, n - 1])
+    return np.union1d(idx, keep[(keep >= 0) & (keep < n)])
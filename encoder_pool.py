@@ -0,0 +1,195 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import subprocess
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FFMPEG = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+WORKERS = int(os.environ.get("ENCODER_WORKERS", min(4, os.cpu_count() or 1)))
+# 共享内存中的帧槽数量，即光栅化最多领先编码多少帧
+QUEUE_FRAMES = int(os.environ.get("ENCODER_QUEUE_FRAMES", 16))
+# 阻塞等待帧槽 / 完成消息时，每隔这么多秒检查一次编码进程是否还活着
+LIVENESS_POLL = 1.0
+
+
+def ffmpeg_command(path, width, height, fps):
+    """RGBA 原始帧从 stdin 读入，按输出扩展名选编码器 (与 manim 默认一致)"""
+    cmd = [FFMPEG, "-y", "-loglevel", "error", "-f", "rawvideo", "-s", f"{width}x{height}", "-pix_fmt", "rgba",
+           "-r", str(fps), "-i", "-", "-an"]
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".webm":
+        cmd += ["-vcodec", "libvpx-vp9", "-auto-alt-ref", "0"]
+    elif ext == ".mov":
+        cmd += ["-vcodec", "qtrle"]
+    else:
+        cmd += ["-vcodec", "libx264", "-pix_fmt", "yuv420p"]
+    return cmd + [path]
+
+
+def _encoder_main(tasks, free, done, shm_name, slot_bytes):
+    """常驻编码进程: 每个片段一个 ffmpeg 子进程，帧数据从共享内存槽直接写入其 stdin"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    segments = {}
+    try:
+        while True:
+            msg = tasks.get()
+            if msg[0] == "stop":
+                return
+            if msg[0] == "open":
+                _, seg, path, width, height, fps = msg
+                segments[seg] = {"proc": None, "frames": 0, "seconds": 0.0, "error": None}
+                try:
+                    segments[seg]["proc"] = subprocess.Popen(ffmpeg_command(path, width, height, fps),
+                                                             stdin=subprocess.PIPE)
+                except OSError as e:
+                    # 失败的片段仍要消费它的帧槽，错误在 wait() 时报告
+                    segments[seg]["error"] = str(e)
+            elif msg[0] == "frame":
+                _, seg, slot, nbytes, count = msg
+                entry = segments[seg]
+                started = time.perf_counter()
+                view = shm.buf[slot * slot_bytes:slot * slot_bytes + nbytes]
+                try:
+                    if entry["error"] is None:
+                        for _ in range(count):
+                            entry["proc"].stdin.write(view)
+                except OSError as e:
+                    entry["error"] = str(e)
+                finally:
+                    view.release()
+                    free.put(slot)
+                entry["frames"] += count
+                entry["seconds"] += time.perf_counter() - started
+            elif msg[0] == "close":
+                seg = msg[1]
+                entry = segments.pop(seg)
+                started = time.perf_counter()
+                code = 0
+                if entry["proc"] is not None:
+                    try:
+                        entry["proc"].stdin.close()
+                    except OSError:
+                        pass
+                    code = entry["proc"].wait()
+                error = entry["error"] or (f"ffmpeg exited with {code}" if code else None)
+                done.put((seg, error, entry["frames"], entry["seconds"] + time.perf_counter() - started))
+    finally:
+        shm.close()
+
+
+class EncoderPool:
+    """常驻编码进程池 + 有界共享内存帧队列
+
+    光栅化进程把帧拷进空闲槽后只传槽号，编码进程直接从共享内存写给 ffmpeg;
+    槽用完时 submit 阻塞，形成背压。片段 (partial movie) 按轮转分给各编码进程，
+    同一片段的帧只由一个进程按序写入，不同片段并行编码，也与后续光栅化并行。
+    """
+
+    def __init__(self, slot_bytes, workers=WORKERS, queue_frames=QUEUE_FRAMES):
+        ctx = multiprocessing.get_context("spawn")
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes * queue_frames)
+        self._slots = np.ndarray((queue_frames, slot_bytes), dtype=np.uint8, buffer=self.shm.buf)
+        self.free = ctx.Queue()
+        for slot in range(queue_frames):
+            self.free.put(slot)
+        self.done = ctx.Queue()
+        self.tasks = [ctx.Queue() for _ in range(workers)]
+        self.procs = [ctx.Process(target=_encoder_main, args=(q, self.free, self.done, self.shm.name, slot_bytes),
+                                  daemon=True) for q in self.tasks]
+        for p in self.procs:
+            p.start()
+        self._next = 0
+        self._owner = {}
+        self._finished = {}
+        self.stats = {"submit_frames": 0, "submit_seconds": 0.0, "encode_frames": 0, "encode_seconds": 0.0}
+
+    def alive(self):
+        return all(p.is_alive() for p in self.procs)
+
+    def _get(self, q):
+        """带存活检查的阻塞读取: 编码进程崩溃 (ffmpeg 异常、OOM) 时抛错而不是永久挂起"""
+        while True:
+            try:
+                return q.get(timeout=LIVENESS_POLL)
+            except queue.Empty:
+                dead = [p.exitcode for p in self.procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"encoder process exited unexpectedly (exit codes {dead})")
+
+    def open(self, path, width, height, fps):
+        """开始一个输出片段，返回片段号"""
+        seg = self._next
+        self._next += 1
+        self._owner[seg] = self.tasks[seg % len(self.tasks)]
+        self._owner[seg].put(("open", seg, path, width, height, fps))
+        return seg
+
+    def submit(self, seg, frame, count=1):
+        """把一帧 (H, W, 4) uint8 写入共享内存并排队，count > 1 表示重复的定格帧"""
+        started = time.perf_counter()
+        frame = np.ascontiguousarray(frame).reshape(-1).view(np.uint8)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"frame of {frame.nbytes} bytes exceeds slot size {self.slot_bytes}")
+        slot = self._get(self.free)
+        self._slots[slot, :frame.nbytes] = frame
+        self._owner[seg].put(("frame", seg, slot, frame.nbytes, count))
+        self.stats["submit_frames"] += count
+        self.stats["submit_seconds"] += time.perf_counter() - started
+
+    def close(self, seg):
+        self._owner[seg].put(("close", seg))
+
+    def wait(self, segs):
+        """等待给定片段全部编码完成; 任一片段失败则抛 RuntimeError"""
+        segs = set(segs)
+        while not segs <= self._finished.keys():
+            seg, error, frames, seconds = self._get(self.done)
+            self._finished[seg] = error
+            self.stats["encode_frames"] += frames
+            self.stats["encode_seconds"] += seconds
+        errors = {seg: self._finished.pop(seg) for seg in segs}
+        for seg in segs:
+            self._owner.pop(seg, None)
+        failed = {seg: e for seg, e in errors.items() if e}
+        if failed:
+            raise RuntimeError(f"encoding failed: {failed}")
+
+    def stage_fps(self):
+        s = self.stats
+        return {"submit": s["submit_frames"] / s["submit_seconds"] if s["submit_seconds"] else 0.0,
+                "encode": s["encode_frames"] / s["encode_seconds"] if s["encode_seconds"] else 0.0}
+
+    def shutdown(self):
+        for q in self.tasks:
+            q.put(("stop",))
+        for p in self.procs:
+            p.join(timeout=10)
+        del self._slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+_pool = None
+
+
+def get_pool(slot_bytes):
+    """进程内共享的编码池，跨场景、跨批量任务复用; 帧变大或有编码进程退出时重建"""
+    global _pool
+    if _pool is not None and (_pool.slot_bytes < slot_bytes or not _pool.alive()):
+        shutdown_pool()
+    if _pool is None:
+        _pool = EncoderPool(slot_bytes)
+    return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -0,0 +1,163 @@
+import numpy as np
+from manim import Camera, VMobject, config
+from manim.constants import RendererType
+from manim.renderer.cairo_renderer import CairoRenderer
+from manim.scene.scene_file_writer import SceneFileWriter
+
+# 脏区域超过画面这个比例时直接整帧重绘
+FULL_REDRAW_RATIO = 0.5
+# 脏区域外扩 (像素)，覆盖描边宽度与抗锯齿
+DIRTY_PADDING = 8
+
+
+class ClipCamera(Camera):
+    """支持只重绘一个矩形区域的 Camera
+
+    clip_rect = (x0, y0, x1, y1) 像素坐标; 设置后背景只在该区域内重置，
+    cairo 绘制也被裁剪到该区域，区域外保留上一帧的像素。
+    """
+
+    clip_rect = None
+
+    def set_pixel_array(self, pixel_array, convert_from_floats=False):
+        if self.clip_rect is None or np.shape(pixel_array) != self.pixel_array.shape:
+            return super().set_pixel_array(pixel_array, convert_from_floats)
+        x0, y0, x1, y1 = self.clip_rect
+        converted = self.convert_pixel_array(pixel_array, convert_from_floats)
+        self.pixel_array[y0:y1, x0:x1] = converted[y0:y1, x0:x1]
+
+    def get_cairo_context(self, pixel_array):
+        ctx = super().get_cairo_context(pixel_array)
+        # context 会被缓存复用，每次都要先清掉上一次的裁剪
+        ctx.reset_clip()
+        if self.clip_rect is not None:
+            x0, y0, x1, y1 = self.clip_rect
+            matrix = ctx.get_matrix()
+            ctx.identity_matrix()
+            ctx.rectangle(x0, y0, x1 - x0, y1 - y0)
+            ctx.clip()
+            ctx.set_matrix(matrix)
+        return ctx
+
+
+def _signature(mobject):
+    """mobject 外观的廉价指纹: 点坐标、颜色、线宽、层级"""
+    parts = []
+    for m in mobject.get_family():
+        parts.append(hash(m.points.tobytes()))
+        parts.append(m.z_index)
+        if isinstance(m, VMobject):
+            parts.append(hash(m.fill_rgbas.tobytes()))
+            parts.append(hash(m.stroke_rgbas.tobytes()))
+            parts.append(m.stroke_width)
+        else:
+            parts.append(hash(getattr(m, "pixel_array", np.empty(0)).tobytes()))
+    return hash(tuple(parts))
+
+
+class FrameDiffRenderer(CairoRenderer):
+    """跳过没有变化的帧，只重绘局部变化的区域
+
+    每帧先计算场景中各顶层 mobject 的指纹:
+    - 与上一帧完全相同: 不光栅化，直接把上一帧像素交给编码器 (held frame)
+    - 只有部分 mobject 变化: 只在其新旧包围盒的并集内重绘
+    - 含位图 mobject 或变化面积过大: 整帧重绘
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("camera_class", ClipCamera)
+        super().__init__(*args, **kwargs)
+        self._last = None
+        self._in_render = False
+        self.stats = {"rendered": 0, "clipped": 0, "held": 0}
+
+    def init_scene(self, scene):
+        # 复用的 renderer 开始新场景，上一场景的最后一帧不能当作参照
+        self._last = None
+        super().init_scene(scene)
+
+    def _pixel_box(self, mobject):
+        points = mobject.get_all_points()
+        if not len(points):
+            return None
+        cam = self.camera
+        scale_x = cam.pixel_width / cam.frame_width
+        scale_y = cam.pixel_height / cam.frame_height
+        cx, cy = cam.frame_center[:2]
+        x = (points[:, 0] - cx) * scale_x + cam.pixel_width / 2
+        y = (cy - points[:, 1]) * scale_y + cam.pixel_height / 2
+        return x.min(), y.min(), x.max(), y.max()
+
+    def _dirty_rect(self, previous, current):
+        boxes = []
+        for key in previous.keys() | current.keys():
+            old, new = previous.get(key), current.get(key)
+            if old is not None and new is not None and old[0] == new[0]:
+                continue
+            for entry in (old, new):
+                if entry is None:
+                    continue
+                if entry[2]:
+                    return None  # 位图 mobject 无法裁剪
+                if entry[1] is not None:
+                    boxes.append(entry[1])
+        if not boxes:
+            return None
+        boxes = np.array(boxes)
+        cam = self.camera
+        x0 = int(max(boxes[:, 0].min() - DIRTY_PADDING, 0))
+        y0 = int(max(boxes[:, 1].min() - DIRTY_PADDING, 0))
+        x1 = int(min(boxes[:, 2].max() + DIRTY_PADDING + 1, cam.pixel_width))
+        y1 = int(min(boxes[:, 3].max() + DIRTY_PADDING + 1, cam.pixel_height))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        if (x1 - x0) * (y1 - y0) > FULL_REDRAW_RATIO * cam.pixel_width * cam.pixel_height:
+            return None
+        return x0, y0, x1, y1
+
+    def render(self, scene, time, moving_mobjects):
+        current = {}
+        for mob in [*scene.mobjects, *scene.foreground_mobjects]:
+            is_bitmap = any(not isinstance(m, VMobject) and len(m.points) for m in mob.get_family())
+            current[id(mob)] = (_signature(mob), self._pixel_box(mob), is_bitmap)
+
+        previous = self._last
+        if previous is not None and {k: v[0] for k, v in previous.items()} == {k: v[0] for k, v in current.items()}:
+            self.stats["held"] += 1
+            self.add_frame(self.get_frame())
+            return
+
+        self.camera.clip_rect = None if previous is None else self._dirty_rect(previous, current)
+        clipped = self.camera.clip_rect is not None
+        self._in_render = True
+        try:
+            self.update_frame(scene, moving_mobjects)
+        finally:
+            self._in_render = False
+            self.camera.clip_rect = None
+        self._last = current
+        self.stats["clipped" if clipped else "rendered"] += 1
+        self.add_frame(self.get_frame())
+
+    def update_frame(self, scene, *args, **kwargs):
+        # render() 之外的绘制 (定格帧、static_image 预渲染) 会改写像素，上一帧不再可信
+        if not self._in_render:
+            self._last = None
+        super().update_frame(scene, *args, **kwargs)
+
+
+class FrameDiffMixin:
+    """场景使用 FrameDiffRenderer; 设 frame_diff = False 可退回默认渲染器
+
+    file_writer_class 可替换为 async_writer.AsyncFileWriter 等自定义 writer。
+    """
+
+    frame_diff = True
+    file_writer_class = SceneFileWriter
+
+    def __init__(self, *args, renderer=None, **kwargs):
+        if renderer is None and config.renderer == RendererType.CAIRO:
+            renderer_class = FrameDiffRenderer if self.frame_diff else CairoRenderer
+            renderer = renderer_class(file_writer_class=self.file_writer_class,
+                                      skip_animations=kwargs.get("skip_animations", False))
+        super().__init__(*args, renderer=renderer, **kwargs)
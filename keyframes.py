@@ -0,0 +1,76 @@
+import os
+
+from manim import VMobject, config, tempconfig
+from manim.utils.color import color_to_rgb
+
+KEYFRAME_DIR = os.environ.get("MANIM_KEYFRAME_DIR", "keyframes")
+
+
+def save_svg(camera, mobjects, path):
+    """把当前画面的矢量 mobject 直接画到 cairo SVGSurface (与 Camera 的坐标变换一致)
+
+    位图 mobject (ImageMobject) 不会出现在 SVG 中。
+    """
+    import cairo
+
+    pw, ph = camera.pixel_width, camera.pixel_height
+    fw, fh, fc = camera.frame_width, camera.frame_height, camera.frame_center
+    with cairo.SVGSurface(path, pw, ph) as surface:
+        ctx = cairo.Context(surface)
+        ctx.set_source_rgba(*color_to_rgb(config.background_color), config.background_opacity)
+        ctx.paint()
+        ctx.set_matrix(cairo.Matrix(pw / fw, 0, 0, -(ph / fh), pw / 2 - fc[0] * pw / fw, ph / 2 + fc[1] * ph / fh))
+        for mob in camera.get_mobjects_to_display(mobjects):
+            if isinstance(mob, VMobject):
+                camera.display_vectorized(mob, ctx)
+
+
+class KeyframeMixin:
+    """关键帧导出模式: keyframes = ("png",) / ("png", "svg") 或环境变量 MANIM_KEYFRAMES=png,svg
+
+    启用后所有动画以 skip_animations 执行 (只求末状态，不光栅化中间帧、不编码视频)，
+    每个子场景 (cached_section) 结束时光栅化一次当前画面，
+    保存为 <keyframe_dir>/<输出名>/<子场景>.png|.svg。keyframe_sections 可限定只导出部分子场景。
+    """
+
+    keyframes = tuple(f for f in os.environ.get("MANIM_KEYFRAMES", "").split(",") if f)
+    keyframe_sections = tuple(s for s in os.environ.get("MANIM_KEYFRAME_SECTIONS", "").split(",") if s) or None
+    keyframe_dir = KEYFRAME_DIR
+
+    def __init__(self, *args, **kwargs):
+        if self.keyframes:
+            kwargs["skip_animations"] = True
+        super().__init__(*args, **kwargs)
+        self._rasterize = self.renderer.update_frame
+        if self.keyframes:
+            # 跳过动画时 manim 仍会为静态背景与定格帧 (wait) 光栅化; 关键帧模式只在 save_keyframe 中光栅化
+            self.renderer.save_static_frame_data = lambda scene, static_mobjects: None
+            self.renderer.update_frame = lambda *args, **kwargs: None
+
+    def render(self, *args, **kwargs):
+        if not self.keyframes:
+            return super().render(*args, **kwargs)
+        with tempconfig({"write_to_movie": False, "save_last_frame": False, "preview": False}):
+            return super().render(*args, **kwargs)
+
+    def cached_section(self, fn, *args, **kwargs):
+        result = super().cached_section(fn, *args, **kwargs)
+        if self.keyframes and (self.keyframe_sections is None or fn.__name__ in self.keyframe_sections):
+            self.save_keyframe(fn.__name__)
+        return result
+
+    def save_keyframe(self, name):
+        stem = os.path.splitext(os.path.basename(config.output_file or type(self).__name__))[0]
+        out_dir = os.path.join(self.keyframe_dir, stem)
+        os.makedirs(out_dir, exist_ok=True)
+        mobjects = [*self.mobjects, *self.foreground_mobjects]
+        paths = []
+        if "png" in self.keyframes:
+            self.renderer.static_image = None
+            self._rasterize(self, mobjects)
+            paths.append(os.path.join(out_dir, f"{name}.png"))
+            self.renderer.camera.get_image().save(paths[-1])
+        if "svg" in self.keyframes:
+            paths.append(os.path.join(out_dir, f"{name}.svg"))
+            save_svg(self.renderer.camera, mobjects, paths[-1])
+        return paths
@@ -0,0 +1,274 @@
+"""实时动力学监测: 读数逐点到达时增量更新三种方法的结果
+
+示例:
+    python kinetic_live.py run.csv                 # 跟踪分析仪写出的文件 (每行 t, abs 或 t, main, sub)
+    python kinetic_live.py tcp://127.0.0.1:9000    # 从本地 socket 逐行读取
+每个新读数 O(1) 更新终点法、两点速率法与 Rate A 斜率，并做线性度 / 底物耗尽检查。
+"""
+import argparse
+import collections
+import logging
+import math
+import socket
+import time
+
+import bio_engine
+
+log = logging.getLogger(__name__)
+
+
+class _Sums:
+    """最小二乘所需的累加量，以首点为原点减少大数相消"""
+
+    def __init__(self):
+        self.n = 0
+        self.t0 = None
+        self.st = self.sa = self.stt = self.sta = self.saa = 0.0
+
+    def add(self, t, a, sign=1):
+        if self.t0 is None:
+            self.t0 = t
+        u = t - self.t0
+        self.n += sign
+        self.st += sign * u
+        self.sa += sign * a
+        self.stt += sign * u * u
+        self.sta += sign * u * a
+        self.saa += sign * a * a
+
+    def fit(self):
+        """(slope, intercept, r2)，点数不足时为 None"""
+        if self.n < 2:
+            return None
+        sxx = self.stt - self.st * self.st / self.n
+        if sxx <= 0:
+            return None
+        sxy = self.sta - self.st * self.sa / self.n
+        syy = self.saa - self.sa * self.sa / self.n
+        slope = sxy / sxx
+        intercept = self.sa / self.n - slope * (self.st / self.n + self.t0)
+        r2 = 1.0 - max(syy - slope * sxy, 0.0) / syy if syy > 0 else 1.0
+        return slope, intercept, r2
+
+
+class LiveKinetics:
+    """单个反应的增量计算，参数为采样索引 (与 bio_engine 批量函数一致)
+
+    endpoint: (point, prev_point)      Result = (Abs(T) + Abs(T-1)) / 2
+    fix:      (start, end)             Rate = (Delta Abs / Delta T) * scale
+    kinetic:  (start, end, step)       Rate A 最小二乘斜率，窗口 [start, end) 每隔 step 点
+    线性度: 窗口内前 check_points 点与最近 check_points 点的斜率之差超过整体斜率的 linearity_limit。
+    底物耗尽: 最近斜率与起始斜率方向相同但幅度不足 depletion_ratio，或吸光度越过 depletion_abs。
+    采样索引由读数时间 t 换算 (bio_engine.time_to_index)，丢失的读数按缺失处理并标记 missing_reading，
+    不会让后面的测试点整体错位。
+    """
+
+    def __init__(self, endpoint, fix, kinetic, scale=60.0, check_points=5, linearity_limit=0.2,
+                 depletion_ratio=0.5, depletion_abs=None, n_points=bio_engine.DEMO_N_POINTS,
+                 x_max=bio_engine.DEMO_X_MAX):
+        self.endpoint = endpoint
+        self.fix = fix
+        self.kinetic = kinetic
+        self.scale = scale
+        self.check_points = check_points
+        self.linearity_limit = linearity_limit
+        self.depletion_ratio = depletion_ratio
+        self.depletion_abs = depletion_abs
+        self.n_points = n_points
+        self.x_max = x_max
+        self.index = 0
+        self._values = {}
+        self._sums = _Sums()
+        self._early = _Sums()
+        self._late = _Sums()
+        self._late_points = collections.deque()
+        self.flags = set()
+
+    @classmethod
+    def from_times(cls, endpoint_times, fix_times, kinetic_times, kinetic_step, n_points=bio_engine.DEMO_N_POINTS,
+                   **kwargs):
+        """按测试点时间配置 (与 BiochemAlgoViz 的类属性相同)"""
+        start, end = (int(i) for i in bio_engine.time_to_index(kinetic_times, n_points))
+        return cls(tuple(int(i) for i in bio_engine.time_to_index(endpoint_times, n_points)),
+                   tuple(int(i) for i in bio_engine.time_to_index(fix_times, n_points)),
+                   (start, end, kinetic_step), n_points=n_points, **kwargs)
+
+    @property
+    def last_index(self):
+        """全部结果确定所需的最后一个采样索引"""
+        start, end, step = self.kinetic
+        last_kinetic = start + (end - 1 - start) // step * step
+        return max(*self.endpoint, self.fix[1], last_kinetic)
+
+    @property
+    def done(self):
+        return self.index > self.last_index
+
+    def index_of(self, t):
+        """读数时间 -> 采样索引; 加一点余量，避免 t = 0.6 * 5 这类浮点误差退到前一个索引"""
+        return int(bio_engine.time_to_index(t + self.x_max / self.n_points * 1e-6, self.n_points, self.x_max))
+
+    def update(self, t, a):
+        """加入一个读数 (时间, 校正后吸光度)，返回当前结果快照"""
+        i = self.index_of(t)
+        if i < self.index:
+            # 重复或乱序的读数，对应的采样点已经处理过
+            log.warning("ignoring out-of-order reading at t=%g (sample %d already passed)", t, i)
+            return self.result(t, a)
+        if i > self.index:
+            log.warning("readings missing for samples %d-%d", self.index, i - 1)
+            self.flags.add("missing_reading")
+        self.index = i + 1
+        if i in (*self.endpoint, self.fix[0], self.fix[1]):
+            self._values[i] = (t, a)
+
+        start, end, step = self.kinetic
+        if start <= i < end and (i - start) % step == 0:
+            self._sums.add(t, a)
+            if self._early.n < self.check_points:
+                self._early.add(t, a)
+            self._late.add(t, a)
+            self._late_points.append((t, a))
+            if len(self._late_points) > self.check_points:
+                self._late.add(*self._late_points.popleft(), sign=-1)
+            self._check(a)
+        return self.result(t, a)
+
+    def _check(self, a):
+        early, late, overall = self._early.fit(), self._late.fit(), self._sums.fit()
+        if self.depletion_abs is not None and early is not None:
+            if (early[0] > 0 and a > self.depletion_abs) or (early[0] < 0 and a < self.depletion_abs):
+                self.flags.add("substrate_depletion")
+        # 前后两个子窗口不重叠时才比较
+        if early is None or late is None or self._sums.n < 2 * self.check_points:
+            return
+        if overall[0] and abs(late[0] - early[0]) > self.linearity_limit * abs(overall[0]):
+            self.flags.add("nonlinear")
+        if early[0] * late[0] > 0 and abs(late[0]) < self.depletion_ratio * abs(early[0]):
+            self.flags.add("substrate_depletion")
+
+    def result(self, t=None, a=None):
+        """当前结果; 尚未到达终点的两点速率用最新读数给出临时值 (fix_time_final 为 False)"""
+        point, prev_point = self.endpoint
+        endpoint = None
+        if point in self._values and prev_point in self._values:
+            endpoint = (self._values[point][1] + self._values[prev_point][1]) / 2
+
+        fix_rate, fix_final = None, False
+        start, end = self.fix
+        if start in self._values:
+            t_s, a_s = self._values[start]
+            if end in self._values:
+                t, a = self._values[end]
+                fix_final = True
+            if t is not None and t != t_s:
+                fix_rate = (a - a_s) / (t - t_s) * self.scale
+
+        fit = self._sums.fit()
+        return {
+            "index": self.index - 1,
+            "endpoint": endpoint,
+            "fix_time": fix_rate,
+            "fix_time_final": fix_final,
+            "rate_a": None if fit is None else fit[0],
+            "rate_a_intercept": None if fit is None else fit[1],
+            "r2": None if fit is None else fit[2],
+            "n_kinetic": self._sums.n,
+            "flags": sorted(self.flags),
+        }
+
+
+def parse_reading(line):
+    """"t, abs" 或 "t, main, sub" (双波长，返回 main - sub)；空行 / 注释返回 None，格式不对抛 ValueError"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    fields = [float(v) for v in line.replace(",", " ").split()]
+    if len(fields) == 2:
+        return fields[0], fields[1]
+    if len(fields) == 3:
+        return fields[0], fields[1] - fields[2]
+    raise ValueError(f"expected 2 or 3 fields, got {len(fields)}")
+
+
+def _readings(lines):
+    """逐行解析; 单行损坏 (传输错误、半行) 只记录并跳过，不中断监测"""
+    for line in lines:
+        try:
+            reading = parse_reading(line)
+        except ValueError as e:
+            log.warning("skipping malformed reading %r: %s", line.strip(), e)
+            continue
+        if reading is not None:
+            yield reading
+
+
+def tail_file(path, poll=0.2, idle_timeout=30.0):
+    """跟踪一个正在写入的读数文件 (分析仪的替身)，idle_timeout 秒没有新行即结束"""
+    with open(path) as f:
+        idle = 0.0
+        pending = ""
+        while idle < idle_timeout:
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(poll)
+                idle += poll
+                continue
+            idle = 0.0
+            pending += chunk
+            # 只处理已写完整的行
+            if pending.endswith("\n"):
+                yield from _readings([pending])
+                pending = ""
+
+
+def socket_feed(host, port, timeout=30.0):
+    """连接本地 socket，每行一个读数，对端关闭连接时结束"""
+    with socket.create_connection((host, port), timeout=timeout) as conn, conn.makefile("r") as f:
+        yield from _readings(f)
+
+
+def open_feed(source, **kwargs):
+    """"tcp://host:port" 为 socket，其余按文件跟踪"""
+    if str(source).startswith("tcp://"):
+        host, port = source[len("tcp://"):].rsplit(":", 1)
+        return socket_feed(host, int(port), **kwargs)
+    return tail_file(source, **kwargs)
+
+
+def monitor(feed, kinetics):
+    """逐点更新，yield (t, abs, 结果快照)；全部结果确定后停止"""
+    for t, a in feed:
+        yield t, a, kinetics.update(t, a)
+        if kinetics.done:
+            return
+
+
+def _fmt(value):
+    return "-" if value is None or (isinstance(value, float) and math.isnan(value)) else f"{value:.4f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live kinetic monitor for one reaction")
+    parser.add_argument("source", help="readings file to follow, or tcp://host:port")
+    parser.add_argument("--endpoint", type=float, nargs=2, default=(50, 49), metavar=("T", "T_PREV"))
+    parser.add_argument("--fix", type=float, nargs=2, default=(20, 50), metavar=("START", "END"))
+    parser.add_argument("--kinetic", type=float, nargs=2, default=(30, 50), metavar=("START", "END"))
+    parser.add_argument("--step", type=int, default=2)
+    parser.add_argument("--n-points", type=int, default=bio_engine.DEMO_N_POINTS)
+    parser.add_argument("--depletion-abs", type=float, help="absorbance limit for substrate depletion")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+
+    kinetics = LiveKinetics.from_times(args.endpoint, args.fix, args.kinetic, args.step, args.n_points,
+                                       depletion_abs=args.depletion_abs)
+    result = None
+    for t, a, result in monitor(open_feed(args.source), kinetics):
+        print(f"t={t:7.2f}  A={a:.4f}  RateA={_fmt(result['rate_a'])} (n={result['n_kinetic']}, "
+              f"r2={_fmt(result['r2'])})  Fix={_fmt(result['fix_time'])}{'' if result['fix_time_final'] else '*'}  "
+              f"End={_fmt(result['endpoint'])}  {' '.join(result['flags'])}", flush=True)
+    return 0 if result is not None and not result["flags"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+import contextlib
+import csv
+import os
+import time
+
+from manim import config
+
+PROFILE_DIR = os.environ.get("MANIM_PROFILE_DIR", "profiles")
+
+# 各类计时的 "自身时间" 归入的类别
+_CATEGORY = {"interpolate": "interpolation", "rasterize": "rasterization", "encode": "encode",
+             "finish": "encode"}
+
+
+class ProfileMixin:
+    """性能剖析模式: MANIM_PROFILE=1 (或类属性 profile = True) 时启用
+
+    计时树: 场景 -> 子场景 (cached_section) -> play / wait -> interpolate / rasterize / encode。
+    每个节点记录调用次数、总时间与自身时间 (扣除子节点):
+    - 子场景与场景根节点的自身时间 = mobject 构建 (Text 排版、plot_line_graph 等)
+    - play / wait 的自身时间 = 动画 begin / clean_up (Transform 的副本、对齐点等)
+    渲染结束后输出 profiles/<输出名>.folded (flamegraph.pl / speedscope 可直接读取，单位微秒)
+    与 profiles/<输出名>.profile.csv。异步编码时 encode 只包含提交与背压等待的时间。
+    """
+
+    profile = bool(os.environ.get("MANIM_PROFILE"))
+    profile_dir = PROFILE_DIR
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._profile = {}
+        self._profile_stack = []
+        if self.profile:
+            # 叶子计时点: 每帧的插值、光栅化、编码，以及结尾的拼接
+            for obj, method, name in ((self, "update_to_time", "interpolate"),
+                                      (self.renderer, "update_frame", "rasterize"),
+                                      (self.renderer.file_writer, "write_frame", "encode"),
+                                      (self.renderer, "scene_finished", "finish")):
+                setattr(obj, method, self._timed(name, getattr(obj, method)))
+
+    def next_record(self, **params):
+        super().next_record(**params)
+        # 每条记录单独出报告; file writer 是新建的，编码计时点要重新挂上
+        self._profile = {}
+        if self.profile:
+            file_writer = self.renderer.file_writer
+            file_writer.write_frame = self._timed("encode", file_writer.write_frame)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        if not self.profile:
+            yield
+            return
+        path = (*self._profile_stack[-1], name) if self._profile_stack else (name,)
+        self._profile_stack.append(path)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._profile_stack.pop()
+            record = self._profile.setdefault(path, [0, 0.0, 0.0])
+            record[0] += 1
+            record[1] += elapsed
+            if self._profile_stack:
+                self._profile.setdefault(self._profile_stack[-1], [0, 0.0, 0.0])[2] += elapsed
+
+    def _timed(self, name, method):
+        def wrapper(*args, **kwargs):
+            with self._span(name):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def play(self, *animations, **kwargs):
+        names = "+".join("animate" if type(a).__name__ == "_AnimationBuilder" else type(a).__name__
+                         for a in animations)
+        with self._span(f"play:{names}"):
+            return super().play(*animations, **kwargs)
+
+    def wait(self, *args, **kwargs):
+        with self._span("wait"):
+            return super().wait(*args, **kwargs)
+
+    def cached_section(self, fn, *args, **kwargs):
+        with self._span(fn.__name__):
+            return super().cached_section(fn, *args, **kwargs)
+
+    def render(self, *args, **kwargs):
+        with self._span(type(self).__name__):
+            result = super().render(*args, **kwargs)
+        if self.profile:
+            self.write_profile()
+        return result
+
+    def profile_rows(self):
+        """[(路径, 类别, 调用次数, 总秒数, 自身秒数)]，按首次出现顺序"""
+        rows = []
+        for path, (calls, total, children) in self._profile.items():
+            name = path[-1]
+            if name in _CATEGORY:
+                category = _CATEGORY[name]
+            elif name == "wait" or name.startswith("play:"):
+                category = "animation_setup"
+            else:
+                category = "construction"
+            rows.append((path, category, calls, total, total - children))
+        return rows
+
+    def write_profile(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(config.output_file or type(self).__name__))[0]
+        base = os.path.join(self.profile_dir, stem)
+        rows = self.profile_rows()
+        with open(f"{base}.folded", "w") as f:
+            for path, _, _, _, self_time in rows:
+                if round(self_time * 1e6):
+                    f.write(f"{';'.join(path)} {round(self_time * 1e6)}\n")
+        with open(f"{base}.profile.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["path", "category", "calls", "total_s", "self_s"])
+            for path, category, calls, total, self_time in rows:
+                writer.writerow([";".join(path), category, calls, f"{total:.6f}", f"{self_time:.6f}"])
+        return base
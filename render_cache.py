@@ -0,0 +1,148 @@
+import contextlib
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+import manim
+import numpy as np
+from manim import config
+
+import decimate
+import text_cache
+
+CACHE_DIR = os.environ.get(
+    "MANIM_SECTION_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "manim_bioAlg", "sections"))
+# 影响画面的 config 项
+CONFIG_KEYS = ("pixel_width", "pixel_height", "frame_rate", "background_color", "movie_file_extension")
+# 所有段落共用的绘制辅助模块，源码变化时全部段落失效
+HELPER_MODULES = (text_cache, decimate)
+
+
+def _feed(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(f"{value.dtype}{value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for k in sorted(value, key=str):
+            _feed(h, k)
+            _feed(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(f"[{len(value)}".encode())
+        for v in value:
+            _feed(h, v)
+    elif callable(value) or inspect.ismodule(value):
+        h.update(inspect.getsource(value).encode())
+    else:
+        h.update(repr(value).encode())
+
+
+def section_key(prev_key, funcs, inputs):
+    """段落哈希 = 上一段哈希 + manim 版本 + 绘制代码源码 (含公共辅助模块) + 画面相关 config + 数据输入
+
+    串联上一段哈希是因为每段都从上一段结束时的画面状态 (标题、坐标轴) 开始。
+    """
+    h = hashlib.sha1(prev_key.encode())
+    h.update(manim.__version__.encode())
+    _feed(h, [*HELPER_MODULES, *funcs])
+    _feed(h, {k: str(config[k]) for k in CONFIG_KEYS})
+    _feed(h, inputs)
+    return h.hexdigest()
+
+
+@contextlib.contextmanager
+def _spliced(file_writer):
+    """拼接期间把缓存片段插回 partial movie 列表 (整体与各 section)，结束后还原"""
+    movie_files = file_writer.partial_movie_files
+    section_files = {id(section): section.partial_movie_files for section in file_writer.sections}
+    merged = list(movie_files)
+    merged_sections = {}
+    # 从后往前插入，前面记录的位置不受影响
+    for section, pos, section_pos, segments in reversed(file_writer.cached_segments):
+        merged[pos:pos] = segments
+        files = merged_sections.setdefault(id(section), list(section.partial_movie_files))
+        files[section_pos:section_pos] = segments
+    file_writer.partial_movie_files = merged
+    for section in file_writer.sections:
+        section.partial_movie_files = merged_sections.get(id(section), section.partial_movie_files)
+    try:
+        yield
+    finally:
+        file_writer.partial_movie_files = movie_files
+        for section in file_writer.sections:
+            section.partial_movie_files = section_files.get(id(section), section.partial_movie_files)
+
+
+def _install_splice(file_writer):
+    if hasattr(file_writer, "cached_segments"):
+        return
+    file_writer.cached_segments = []  # (section, 整体列表位置, section 内位置, 片段路径)
+    for name in ("combine_to_movie", "combine_to_section_videos"):
+        def combine(method=getattr(file_writer, name)):
+            with _spliced(file_writer):
+                return method()
+        setattr(file_writer, name, combine)
+
+
+class SectionCacheMixin:
+    """把每个子场景当作可缓存的段落
+
+    命中时该段以 skip_animations 执行 (只建立末状态，不光栅化、不编码)，
+    缓存的视频片段单独记录，拼接时才插回 partial movie 列表，由 manim 直接拼接，不重新编码。
+    未命中时正常渲染，并把本段的 partial movie 文件存入缓存。
+    """
+
+    section_cache_dir = CACHE_DIR
+    use_section_cache = True
+
+    def setup(self):
+        # 段落哈希链从每次 render 重新开始 (模板模式下同一实例会渲染多条记录)
+        self._section_key = ""
+        super().setup()
+
+    def cached_section(self, fn, *args, inputs=(), deps=()):
+        key = section_key(getattr(self, "_section_key", ""), [fn, *deps], inputs)
+        self._section_key = key
+        if not self.use_section_cache or not config.write_to_movie:
+            return fn(*args)
+
+        seg_dir = os.path.join(self.section_cache_dir, key)
+        manifest = os.path.join(seg_dir, "segments.json")
+        if os.path.exists(manifest):
+            self.next_section(fn.__name__, skip_animations=True)
+            result = fn(*args)
+            with open(manifest) as f:
+                segments = [os.path.join(seg_dir, name) for name in json.load(f)]
+            # 渲染期间 partial_movie_files 按 num_plays 下标写入，不能直接插入，否则后续动画会覆盖缓存片段
+            file_writer = self.renderer.file_writer
+            _install_splice(file_writer)
+            file_writer.cached_segments.append((file_writer.sections[-1], len(file_writer.partial_movie_files),
+                                                len(file_writer.sections[-1].partial_movie_files), segments))
+            return result
+
+        self.next_section(fn.__name__)
+        result = fn(*args)
+        self._store_section(seg_dir)
+        return result
+
+    def _store_section(self, seg_dir):
+        # 异步编码时片段可能还没写完
+        wait_encoded = getattr(self.renderer.file_writer, "wait_encoded", None)
+        if wait_encoded is not None:
+            wait_encoded()
+        files = [p for p in self.renderer.file_writer.sections[-1].partial_movie_files if p]
+        tmp = f"{seg_dir}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        names = []
+        for i, path in enumerate(files):
+            name = f"{i:04d}{os.path.splitext(path)[1]}"
+            shutil.copyfile(path, os.path.join(tmp, name))
+            names.append(name)
+        with open(os.path.join(tmp, "segments.json"), "w") as f:
+            json.dump(names, f)
+        try:
+            os.replace(tmp, seg_dir)
+        except OSError:
+            # 其他进程已写入同一段落
+            shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,234 @@
+"""并行渲染入口: 在进程池中同时渲染多个场景 / 多个患者
+
+示例:
+    python render_farm.py                                  # 三个场景全部渲染
+    python render_farm.py T21ScreeningProcess -j 32 --t21-records cohort.csv
+    python render_farm.py XGBoostShapViz --xgb-cohort registry.csv --xgb-model model.json
+    python render_farm.py BiochemAlgoViz --quality low
+    python render_farm.py BiochemAlgoViz --quality low --profile   # 输出 profiles/*.folded 与 *.profile.csv
+    python render_farm.py T21ScreeningProcess -j 1 --t21-records cohort.csv --keyframes png \
+        --keyframe-sections risk_assessment_scene                  # 每个患者一张结果 PNG，不编码视频
+"""
+import argparse
+import csv
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 场景名 -> (模块, 默认输出文件)
+SCENES = {
+    "BiochemAlgoViz": ("bio", "Biochem_Algo_Viz.mp4"),
+    "T21ScreeningProcess": ("T21Screening", "T21筛查演示视频.mp4"),
+    "XGBoostShapViz": ("xgboostDiease", "XGBoost_SHAP_HD.mp4"),
+}
+
+QUALITY = {
+    "low": {"pixel_height": 480, "pixel_width": 854, "frame_rate": 15},
+    "medium": {"pixel_height": 720, "pixel_width": 1280, "frame_rate": 30},
+    "high": {"pixel_height": 1080, "pixel_width": 1920, "frame_rate": 60},
+}
+
+
+def load_scene(name):
+    module, _ = SCENES[name]
+    return getattr(importlib.import_module(module), name)
+
+
+def _headless(config_overrides):
+    from manim import BLACK
+
+    # 每个任务一份独立的 config，互不影响; 无预览、无进度条，适合无头运行
+    return {"background_color": BLACK, "preview": False, "progress_bar": "none", "verbosity": "WARNING",
+            **config_overrides}
+
+
+def render_job(name, config_overrides, params=None):
+    """在工作进程中渲染一个场景; params 作为场景类属性 (如 record / store_path)"""
+    from manim import tempconfig
+
+    scene_cls = load_scene(name)
+    if params:
+        scene_cls = type(name, (scene_cls,), params)
+    started = time.perf_counter()
+    with tempconfig(_headless(config_overrides)):
+        scene_cls().render()
+    return config_overrides["output_file"], time.perf_counter() - started
+
+
+def render_batch(name, jobs):
+    """模板模式: 在同一个常驻进程里用同一个场景实例依次渲染一批患者
+
+    场景实例及其 renderer / camera、导入、字形缓存、静态 mobject 模板 (TemplateMixin)
+    与静态段落缓存 (SectionCacheMixin) 在整批之间复用; 换患者时 next_record 只清除与数据相关的
+    mobject 并为新输出建立 file writer。某个患者失败后丢弃该实例 (状态未知)，下一个患者重新构建;
+    失败不影响同批其余任务，返回 [(输出文件, 秒数, 错误或 None)]。
+    """
+    from manim import tempconfig
+
+    scene_cls = load_scene(name)
+    scene = None
+    results = []
+    for overrides, params in jobs:
+        started = time.perf_counter()
+        try:
+            with tempconfig(_headless(overrides)):
+                if scene is None:
+                    scene = scene_cls()
+                    for key, value in (params or {}).items():
+                        setattr(scene, key, value)
+                else:
+                    scene.next_record(**(params or {}))
+                scene.render()
+            results.append((overrides["output_file"], time.perf_counter() - started, None))
+        except Exception as e:
+            scene = None
+            results.append((overrides["output_file"], time.perf_counter() - started, repr(e)))
+    return results
+
+
+def _parse_value(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def read_records(path):
+    """读取筛查记录 CSV，每行一个患者 (列名同 t21_engine.INPUTS，另需 id 列)
+
+    id 保持原始字符串: "001" 不能变成 1.0，否则 "1" 与 "01" 会写到同一个输出文件。
+    """
+    with open(path, newline="") as f:
+        return [{k: v if k == "id" else _parse_value(v) for k, v in row.items()} for row in csv.DictReader(f)]
+
+
+def _xgb_kept(cohort):
+    import biomarker_filter
+
+    headers, columns = biomarker_filter.read_table(cohort)
+    markers = biomarker_filter.check_markers(headers)
+    return columns, biomarker_filter.preprocess(columns, markers)["keep"].nonzero()[0]
+
+
+def xgb_patient_ids(cohort):
+    """筛选后保留的患者 ID (与 data_cleaning_scene 使用同一预处理)"""
+    import biomarker_filter
+
+    columns, kept = _xgb_kept(cohort)
+    return columns[biomarker_filter.ID_COLUMN][kept].tolist()
+
+
+def precompute_xgb_shap(cohort, model_path, workers=None):
+    """分发 --xgb-cohort 任务前对全部保留患者一次性计算 SHAP 并写入缓存 (一个分片)
+
+    各患者场景的 explain_patient 与这里使用同一读取与特征构造，只读缓存，不再逐个计算、逐个写分片。
+    """
+    import biomarker_filter
+    import shap_engine
+    from xgb_engine import FlatForest
+
+    columns, kept = _xgb_kept(cohort)
+    x = FlatForest.load(model_path).features_from_columns(columns, kept, biomarker_filter.ID_COLUMN)
+    shap_engine.explain_cohort(model_path, columns[biomarker_filter.ID_COLUMN][kept], x, workers)
+    return len(kept)
+
+
+def build_jobs(names, quality, output_dir, t21_records=None, xgb_cohort=None, xgb_model=None):
+    base = {**QUALITY[quality], "media_dir": output_dir}
+    jobs = []
+    for name in names:
+        _, output_file = SCENES[name]
+        if name == "T21ScreeningProcess" and t21_records:
+            for record in read_records(t21_records):
+                patient_id = record.pop("id")
+                jobs.append((name, {**base, "output_file": f"T21_{patient_id}.mp4"}, {"record": record}))
+        elif name == "XGBoostShapViz" and xgb_cohort:
+            for patient_id in xgb_patient_ids(xgb_cohort):
+                params = {"cohort": xgb_cohort, "model_path": xgb_model, "patient_id": patient_id}
+                jobs.append((name, {**base, "output_file": f"XGBoost_SHAP_{patient_id}.mp4"}, params))
+        else:
+            jobs.append((name, {**base, "output_file": output_file}, None))
+    return jobs
+
+
+def split_batches(jobs, workers):
+    """同一场景的任务按工作进程数切成若干批，每批在一个常驻进程里用模板模式渲染"""
+    by_scene = {}
+    for name, overrides, params in jobs:
+        by_scene.setdefault(name, []).append((overrides, params))
+    batches = []
+    for name, scene_jobs in by_scene.items():
+        n = min(workers, len(scene_jobs))
+        batches.extend((name, scene_jobs[i::n]) for i in range(n))
+    return batches
+
+
+def run(jobs, workers):
+    # spawn: 每个工作进程重新导入 manim，全局 config 不会从父进程继承
+    ctx = multiprocessing.get_context("spawn")
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(render_batch, *batch): batch for batch in split_batches(jobs, workers)}
+        for future in as_completed(futures):
+            name, batch = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                # 工作进程本身崩溃 (如被 OOM 杀掉)，整批结果未知
+                failed += len(batch)
+                print(f"[fail] {name} batch of {len(batch)}: {e!r}")
+                continue
+            for output_file, seconds, error in results:
+                if error is None:
+                    print(f"[done] {name} -> {output_file} ({seconds:.1f}s)")
+                else:
+                    failed += 1
+                    print(f"[fail] {name} -> {output_file} ({seconds:.1f}s): {error}")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render BiochemAlgoViz / T21 / XGBoost scenes in parallel")
+    parser.add_argument("scenes", nargs="*", help=f"scenes to render (default: all of {', '.join(SCENES)})")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--quality", choices=QUALITY, default="high")
+    parser.add_argument("--output-dir", default="./media")
+    parser.add_argument("--t21-records", help="CSV of screening records, one T21 video per row")
+    parser.add_argument("--xgb-cohort", help="patient table, one XGBoost/SHAP video per kept patient")
+    parser.add_argument("--xgb-model", help="XGBoost JSON model used with --xgb-cohort")
+    parser.add_argument("--profile", action="store_true", help="write per-animation timing reports (profiling.py)")
+    parser.add_argument("--keyframes", help="export stills instead of video, e.g. png or png,svg (keyframes.py)")
+    parser.add_argument("--keyframe-sections", help="comma-separated sub-scenes to export (default: all)")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenes) - set(SCENES)
+    if unknown:
+        parser.error(f"unknown scene(s): {', '.join(sorted(unknown))}")
+
+    if args.xgb_cohort and not args.xgb_model:
+        parser.error("--xgb-cohort requires --xgb-model")
+    if args.keyframes and not set(args.keyframes.split(",")) <= {"png", "svg"}:
+        parser.error("--keyframes takes png, svg or png,svg")
+
+    jobs = build_jobs(args.scenes or list(SCENES), args.quality, args.output_dir, args.t21_records,
+                      args.xgb_cohort, args.xgb_model)
+    if args.profile:
+        # spawn 出的工作进程继承环境变量，ProfileMixin 在导入时读取
+        os.environ["MANIM_PROFILE"] = "1"
+    if args.keyframes:
+        os.environ["MANIM_KEYFRAMES"] = args.keyframes
+        os.environ["MANIM_KEYFRAME_SECTIONS"] = args.keyframe_sections or ""
+        os.environ["MANIM_KEYFRAME_DIR"] = os.path.join(args.output_dir, "keyframes")
+    if args.xgb_cohort and any(name == "XGBoostShapViz" for name, _, _ in jobs):
+        started = time.perf_counter()
+        n = precompute_xgb_shap(args.xgb_cohort, args.xgb_model, args.workers)
+        print(f"SHAP for {n} patient(s) computed in {time.perf_counter() - started:.1f}s")
+    # 每个渲染进程各有一个编码池 (encoder_pool)，按渲染进程数分摊 CPU，避免 -j N 时超额订阅
+    os.environ.setdefault("ENCODER_WORKERS", str(max(1, (os.cpu_count() or 1) // max(1, args.workers))))
+    print(f"rendering {len(jobs)} job(s) on {args.workers} worker(s)")
+    return 1 if run(jobs, args.workers) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
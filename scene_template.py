@@ -0,0 +1,34 @@
+class TemplateMixin:
+    """与患者无关的静态 mobject (坐标轴、分布曲线等) 每个进程只构建一次
+
+    之后每个场景实例拿到的是模板的副本，批量渲染时只重建与数据相关的 mobject。
+    批量渲染还可以用 next_record 复用同一个场景实例 (renderer、camera、像素缓冲)，不必每个患者重新构建。
+    """
+
+    _templates = {}
+
+    def template(self, key, build):
+        if key not in TemplateMixin._templates:
+            TemplateMixin._templates[key] = build()
+        return TemplateMixin._templates[key].copy()
+
+    def next_record(self, **params):
+        """准备用本实例渲染下一条记录: params 覆盖场景属性 (如 record / patient_id)
+
+        清除上一条记录留下的 mobject 与 renderer 的播放状态，并按当前 config (output_file 等)
+        为新的输出建立 file writer。在新记录的 tempconfig 内、render() 之前调用。
+        """
+        for name, value in params.items():
+            setattr(self, name, value)
+        self.clear()
+        self.moving_mobjects = []
+        self.static_mobjects = []
+        self.updaters = []
+        renderer = self.renderer
+        renderer.num_plays = 0
+        renderer.time = 0
+        renderer.animations_hashes = []
+        renderer.static_image = None
+        renderer.skip_animations = renderer._original_skipping_status
+        renderer.camera.reset()
+        renderer.init_scene(self)
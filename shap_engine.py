@@ -0,0 +1,263 @@
+import glob
+import hashlib
+import math
+import os
+import time
+import uuid
+
+import numpy as np
+
+from xgb_engine import FlatForest
+
+CACHE_DIR = os.environ.get(
+    "SHAP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "manim_bioAlg", "shap"))
+# 单个模型的缓存分片数超过此值时合并
+COMPACT_SHARDS = 64
+
+
+def model_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def expected_value(forest):
+    """E[f(x)] = base_margin + Sum_leaf v * cover_leaf / cover_root (按 cover 加权)"""
+    tree_of_node = np.searchsorted(forest.roots, np.arange(len(forest.left)), side="right") - 1
+    weight = forest.cover / forest.cover[forest.roots[tree_of_node]]
+    return forest.base_margin + float(np.sum(np.where(forest.is_leaf, forest.value * weight, 0.0)))
+
+
+# 分块计算时单个中间数组的元素上限 (行 x 叶子 x K x (K + 1))
+BLOCK_ELEMENTS = 1 << 22
+
+
+def _shapley_weights(k):
+    """w(s, K) = s! (K - s - 1)! / K!，s = 0..K-1"""
+    return np.array([math.factorial(s) * math.factorial(k - s - 1) / math.factorial(k) for s in range(k)])
+
+
+def _leaf_contributions(value, zero, ones):
+    """一组路径长度同为 K 的叶子对各路径特征的 SHAP 贡献
+
+    路径依赖 TreeSHAP 的叶子项是各特征因子的乘积:
+        S 中特征取 o_j (样本是否沿该路径走)，其余取 z_j (cover 比例)
+    其 Shapley 值为
+        phi_i = v * (o_i - z_i) * Sum_S w(|S|, K) * Prod_{j in S} o_j * Prod_{j not in S, j != i} z_j
+    右侧的和是多项式 Prod_{j != i} (z_j + o_j t) 各次系数的加权和: 先展开全部 K 个因子，
+    再逐个除去 (z_i + o_i t)，每个叶子 O(K^2)，不随 K 指数增长。
+    value: (L,)  zero: (L, K)  ones: (n, L, K) 0/1  ->  (n, L, K)
+    """
+    n, n_leaves, k = ones.shape
+    poly = np.zeros((n, n_leaves, k + 1))
+    poly[..., 0] = 1.0
+    for j in range(k):
+        shifted = poly[..., :-1] * ones[..., j:j + 1]
+        poly *= zero[None, :, j, None]
+        poly[..., 1:] += shifted
+    # o_i = 1: 除以 (z_i + t)，从最高次往下做综合除法 (只乘 z <= 1，数值稳定)，边除边按 w 累加
+    weights = _shapley_weights(k)
+    quotient = np.repeat(poly[..., k, None], k, axis=-1)
+    summed = weights[k - 1] * quotient
+    for d in range(k - 1, 0, -1):
+        quotient = poly[..., d, None] - zero[None] * quotient
+        summed += weights[d - 1] * quotient
+    # o_i = 0: 因子是常数 z_i
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = np.where(zero[None] > 0, (poly[..., :k] @ weights)[..., None] / zero[None], 0.0)
+    summed = np.where(ones > 0, summed, scaled)
+    return value[None, :, None] * (ones - zero[None]) * summed
+
+
+class TreeShapExplainer:
+    """基于 FlatForest 的精确 (路径依赖) TreeSHAP，按行向量化
+
+    每个叶子的路径按特征合并 (同一特征多次出现时 z 连乘、条件取交)，全部树的叶子按合并后的
+    路径长度 K 分组; 计算时一组叶子一起判断样本在各特征上是否顺路，再按多项式展开求贡献。
+    """
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.n_features = forest.n_features
+        self.expected_value = expected_value(forest)
+        f = forest
+        self.internal = np.flatnonzero(~f.is_leaf)
+        column = np.full(len(f.left), -1, dtype=np.intp)
+        column[self.internal] = np.arange(len(self.internal))
+
+        # 按 K 分组: 叶子值、特征、z、每个特征的条件 (内部节点列, 是否向左)
+        groups = {}
+        for root in f.roots:
+            stack = [(root, {})]
+            while stack:
+                node, by_feature = stack.pop()
+                if f.is_leaf[node]:
+                    if by_feature:
+                        groups.setdefault(len(by_feature), []).append((f.value[node], by_feature))
+                    continue
+                for child, went_left in ((f.left[node], True), (f.right[node], False)):
+                    conds, zero = by_feature.get(f.feature[node], ((), 1.0))
+                    path = dict(by_feature)
+                    path[f.feature[node]] = (conds + ((column[node], went_left),),
+                                             zero * f.cover[child] / f.cover[node])
+                    stack.append((child, path))
+
+        # 条件数不足 n_conds 的特征用一个恒为真的虚拟列补齐
+        self._true_column = len(self.internal)
+        self.groups = []
+        for k, leaves in sorted(groups.items()):
+            n_conds = max(len(conds) for _, path in leaves for conds, _ in path.values())
+            cols = np.full((len(leaves), k, n_conds), self._true_column, dtype=np.intp)
+            want = np.ones((len(leaves), k, n_conds), dtype=bool)
+            features = np.empty((len(leaves), k), dtype=np.intp)
+            zero = np.empty((len(leaves), k))
+            for l, (_, path) in enumerate(leaves):
+                for i, (feature, (conds, z)) in enumerate(path.items()):
+                    features[l, i], zero[l, i] = feature, z
+                    for c, (col, went_left) in enumerate(conds):
+                        cols[l, i, c], want[l, i, c] = col, went_left
+            value = np.array([v for v, _ in leaves])
+            self.groups.append((value, features, zero, cols, want))
+
+    def shap_values(self, x):
+        """(N, n_features) -> (N, n_features) SHAP 值 (margin 空间)
+
+        每行满足 shap_values.sum(1) + expected_value == predict_margin。
+        """
+        f = self.forest
+        x = np.asarray(x, dtype=np.float32)
+        phi = np.zeros((len(x), self.n_features))
+        if not len(self.internal):
+            return phi
+        fval = x[:, f.feature[self.internal]]
+        go_left = np.where(np.isnan(fval), f.default_left[self.internal], fval < f.threshold[self.internal])
+        go_left = np.concatenate([go_left, np.ones((len(x), 1), dtype=bool)], axis=1)
+        for value, features, zero, cols, want in self.groups:
+            n_leaves, k, n_conds = cols.shape
+            leaf_block = max(1, min(n_leaves, BLOCK_ELEMENTS // (k * max(k + 1, n_conds))))
+            row_block = max(1, BLOCK_ELEMENTS // (leaf_block * k * max(k + 1, n_conds)))
+            for l0 in range(0, n_leaves, leaf_block):
+                leaves = slice(l0, l0 + leaf_block)
+                for r0 in range(0, len(x), row_block):
+                    rows = slice(r0, r0 + row_block)
+                    ones = np.all(go_left[rows][:, cols[leaves]] == want[leaves], axis=-1).astype(float)
+                    contrib = _leaf_contributions(value[leaves], zero[leaves], ones)
+                    n = len(ones)
+                    flat = (np.arange(n)[:, None] * self.n_features + features[leaves].ravel()[None, :]).ravel()
+                    phi[rows] += np.bincount(flat, contrib.ravel(), minlength=n * self.n_features).reshape(
+                        n, self.n_features)
+        return phi
+
+
+_worker = None
+
+
+def _init_worker(model_path):
+    global _worker
+    _worker = TreeShapExplainer(FlatForest.load(model_path))
+
+
+def _worker_shap(x):
+    return _worker.shap_values(x)
+
+
+def shap_values_parallel(model_path, x, workers=None, chunk_rows=16384):
+    """按行分块，多进程计算整批 SHAP 值"""
+    x = np.asarray(x, dtype=np.float32)
+    chunks = [x[i:i + chunk_rows] for i in range(0, len(x), chunk_rows)]
+    if len(chunks) <= 1 or workers == 1:
+        return TreeShapExplainer(FlatForest.load(model_path)).shap_values(x)
+    # 进程池只在真正并行时导入，批量计算脚本启动时不付这部分开销
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(model_path,)) as pool:
+        return np.concatenate(list(pool.map(_worker_shap, chunks)))
+
+
+def row_keys(ids, x):
+    """缓存键 = 行 ID + 特征行哈希，ID 被复用或特征值被修改时不会读到旧的 SHAP 值"""
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    return np.array([f"{i}:{hashlib.sha1(row.tobytes()).hexdigest()[:16]}" for i, row in zip(ids, x)], dtype=str)
+
+
+class ShapCache:
+    """按 (模型哈希, 行 ID, 特征行哈希) 缓存 SHAP 值: 每个模型一个目录，目录下若干 .npz 分片
+
+    每次 store 只把新行写成一个新分片 (文件名含时间、pid 与随机串，先写临时文件再 os.replace)，
+    并行渲染的多个进程互不覆盖; 分片数超过 COMPACT_SHARDS 时加载方把它们合并成一个。
+    """
+
+    def __init__(self, model_path, cache_dir=CACHE_DIR):
+        self.dir = os.path.join(cache_dir, model_hash(model_path))
+        self.keys = np.empty(0, dtype=str)
+        self.values = None
+        self.expected_value = None
+        shards = []
+        for path in sorted(glob.glob(os.path.join(self.dir, "*.npz"))):
+            try:
+                with np.load(path) as f:
+                    shards.append((path, f["keys"], f["values"], float(f["expected_value"])))
+            except FileNotFoundError:
+                # 刚被其他进程合并掉，其中的行已在合并后的分片里 (或下次重新计算)
+                continue
+        if shards:
+            keys = np.concatenate([k for _, k, _, _ in shards])
+            values = np.concatenate([v for _, _, v, _ in shards])
+            keys, first = np.unique(keys, return_index=True)
+            self.keys, self.values, self.expected_value = keys, values[first], shards[-1][3]
+        if len(shards) > COMPACT_SHARDS:
+            self._write(self.keys, self.values, self.expected_value)
+            for path, _, _, _ in shards:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def lookup(self, keys):
+        """返回 (是否命中的掩码, 命中行在缓存中的位置)；keys 由 row_keys 生成"""
+        keys = np.asarray(keys, dtype=str)
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=bool), np.zeros(len(keys), dtype=np.intp)
+        # self.keys 已由 np.unique 排序
+        pos = np.clip(np.searchsorted(self.keys, keys), 0, len(self.keys) - 1)
+        hit = self.keys[pos] == keys
+        return hit, pos
+
+    def store(self, keys, values, expected_value):
+        keys = np.asarray(keys, dtype=str)
+        values = np.asarray(values, dtype=np.float32)
+        self._write(keys, values, expected_value)
+        if self.values is not None:
+            keys, values = np.concatenate([self.keys, keys]), np.concatenate([self.values, values])
+        keys, first = np.unique(keys, return_index=True)
+        self.keys, self.values, self.expected_value = keys, values[first], expected_value
+
+    def _write(self, keys, values, expected_value):
+        os.makedirs(self.dir, exist_ok=True)
+        name = f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        tmp = os.path.join(self.dir, f"{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, keys=keys, values=values, expected_value=expected_value)
+        os.replace(tmp, os.path.join(self.dir, f"{name}.npz"))
+
+
+def explain_cohort(model_path, ids, x, workers=None, cache_dir=CACHE_DIR):
+    """整批 SHAP: 已缓存的行直接读取，其余行并行计算后写回缓存
+
+    返回 (values (N, n_features) float32, expected_value)。
+    """
+    forest = FlatForest.load(model_path)
+    cache = ShapCache(model_path, cache_dir)
+    x = np.asarray(x, dtype=np.float32)
+    keys = row_keys(ids, x)
+    hit, pos = cache.lookup(keys)
+    out = np.empty((len(keys), forest.n_features), dtype=np.float32)
+    if hit.any():
+        out[hit] = cache.values[pos[hit]]
+    if not hit.all():
+        miss = ~hit
+        out[miss] = shap_values_parallel(model_path, x[miss], workers)
+        cache.store(keys[miss], out[miss], expected_value(forest))
+    return out, expected_value(forest)
@@ -0,0 +1,79 @@
+"""启动开销报告: 每个模块在全新解释器中的导入耗时 (python -X importtime)
+
+示例:
+    python startup.py                        # 数值引擎与三个场景模块
+    python startup.py t21_engine --top 15    # 单个模块，列出最慢的 15 个依赖
+    python startup.py --check                # 数值引擎若引入了渲染栈则返回 1
+"""
+import argparse
+import subprocess
+import sys
+
+# 批量计算路径: 不应导入 manim 等渲染依赖
+ENGINES = ("bio_engine", "bio_stream", "curve_store", "kinetic_live", "t21_engine", "biomarker_filter",
+           "xgb_engine", "shap_engine", "decimate", "t21_montecarlo", "calibration")
+SCENES = ("bio", "T21Screening", "xgboostDiease")
+# 出现在引擎导入链中即视为 "重" 依赖
+HEAVY = ("manim", "cairo", "scipy", "pandas", "pyarrow", "xgboost", "matplotlib")
+
+
+def import_times(module):
+    """在子进程中导入 module，返回 [(名称, 嵌套层级, 自身微秒, 累计微秒)] (按导入完成顺序)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise ImportError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # 名称前每多两个空格表示多一层嵌套导入
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), level, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report(module, top=5):
+    """总耗时、导入链中的重依赖、最慢的直接依赖"""
+    rows = import_times(module)
+    end = max(i for i, r in enumerate(rows) if r[0] == module and r[1] == 0)
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    own = rows[start:end + 1]
+    heavy = sorted({name.split(".")[0] for name, _, _, _ in own} & set(HEAVY))
+    direct = sorted((r for r in own if r[1] == 1), key=lambda r: -r[3])[:top]
+    return {"module": module, "total_ms": rows[end][3] / 1000, "heavy": heavy,
+            "slowest": [(name, cum / 1000) for name, _, _, cum in direct]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report per-module import time in a fresh interpreter")
+    parser.add_argument("modules", nargs="*", help=f"default: {' '.join(ENGINES + SCENES)}")
+    parser.add_argument("--top", type=int, default=5, help="slowest direct dependencies to list")
+    parser.add_argument("--check", action="store_true", help="fail if a numeric engine imports a heavy package")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or (ENGINES if args.check else ENGINES + SCENES)
+    offenders = []
+    for module in modules:
+        try:
+            r = report(module, args.top)
+        except ImportError as e:
+            print(f"{module:18s} {'failed':>8s}     {str(e).splitlines()[-1]}")
+            if module in ENGINES:
+                offenders.append(module)
+            continue
+        deps = ", ".join(f"{name} {ms:.0f}ms" for name, ms in r["slowest"])
+        print(f"{module:18s} {r['total_ms']:8.1f} ms  heavy=[{', '.join(r['heavy'])}]  {deps}")
+        if module in ENGINES and r["heavy"]:
+            offenders.append(module)
+    if args.check and offenders:
+        print(f"engines failing to import or importing heavy packages: {', '.join(offenders)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+
+import t21_mvn
+import t21_tables
+
+# log10(hCG MoM) 分布参数 (与 gaussian_analysis_scene 一致)
+NORM_MEAN, NORM_STD = 0.0, 0.15
+T21_MEAN, T21_STD = 0.3, 0.18
+
+# screen() 接受的输入列
+INPUTS = ("age", "weight", "val_afp", "val_hcg", "median_afp", "median_hcg", "prior", "ga_day", "ga_week")
+
+_LOG_SQRT_2PI = 0.5 * math.log(2 * math.pi)
+
+
+def log_norm_pdf(x, mean, std):
+    """对数空间的高斯密度，避免逐个标量调用 scipy.stats.norm.pdf"""
+    z = (np.asarray(x, dtype=float) - mean) / std
+    return -0.5 * z * z - np.log(std) - _LOG_SQRT_2PI
+
+
+def norm_pdf(x, mean, std):
+    return np.exp(log_norm_pdf(x, mean, std))
+
+
+def weight_factor(weight):
+    """体重校正: factor = 1 / (0.28 + 43 / weight)"""
+    return 1.0 / (0.28 + 43.0 / np.asarray(weight, dtype=float))
+
+
+def corrected_mom(value, median, weight):
+    return np.asarray(value, dtype=float) / median * weight_factor(weight)
+
+
+def log_lr(log_mom_hcg):
+    """log(LR) = log f_T21(x) - log f_Normal(x)，x = log10(hCG MoM)"""
+    return log_norm_pdf(log_mom_hcg, T21_MEAN, T21_STD) - log_norm_pdf(log_mom_hcg, NORM_MEAN, NORM_STD)
+
+
+def screen(age, weight, val_afp, val_hcg, median_afp=None, median_hcg=None, prior=None, ga_day=None,
+           ga_week=t21_mvn.DEFAULT_WEEK, model=t21_mvn.default_model, tables=None):
+    """整列批量筛查，所有参数均可为标量或等长数组
+
+    median_afp / median_hcg / prior 为 None 时按孕日、年龄查表 (t21_tables)。
+    给出 ga_day 时孕周桶取 ga_day // 7，否则孕日取 ga_week * 7。
+    返回字典 (均为 (N,) 数组):
+        factor, median_afp, median_hcg, raw_mom_hcg, mom_afp, mom_hcg, lr, total_lr, prior, risk_denom
+    lr 为单标志物 hCG 的高度比; total_lr 为 AFP + hCG 二元高斯 LR (按孕周桶)。
+    最终风险为 1 : risk_denom。
+    """
+    if ga_day is None:
+        ga_day = np.asarray(ga_week) * 7
+    else:
+        ga_week = np.asarray(ga_day) // 7
+    if median_afp is None or median_hcg is None or prior is None:
+        tables = tables or t21_tables.default_tables()
+        median_afp = tables.median("afp", ga_day) if median_afp is None else median_afp
+        median_hcg = tables.median("hcg", ga_day) if median_hcg is None else median_hcg
+        prior = tables.prior_denom(age) if prior is None else prior
+
+    age = np.asarray(age)
+    factor = weight_factor(weight)
+    raw_mom_hcg = np.asarray(val_hcg, dtype=float) / median_hcg
+    mom_afp = np.asarray(val_afp, dtype=float) / median_afp * factor
+    mom_hcg = raw_mom_hcg * factor
+
+    log_mom_hcg = np.log10(mom_hcg)
+    lr = np.exp(log_lr(log_mom_hcg))
+    log_moms = np.stack(np.broadcast_arrays(np.log10(mom_afp), log_mom_hcg), axis=-1)
+    total_lr = model.lr(log_moms.reshape(-1, 2), ga_week, ("afp", "hcg")).reshape(np.shape(lr))
+    prior = np.broadcast_to(np.asarray(prior, dtype=float), np.shape(total_lr))
+    shape = np.shape(total_lr)
+    return {
+        "age": np.broadcast_to(age, shape),
+        "factor": factor,
+        "median_afp": np.broadcast_to(median_afp, shape),
+        "median_hcg": np.broadcast_to(median_hcg, shape),
+        "raw_mom_hcg": raw_mom_hcg,
+        "mom_afp": mom_afp,
+        "mom_hcg": mom_hcg,
+        "lr": lr,
+        "total_lr": total_lr,
+        "prior": prior,
+        "risk_denom": prior / total_lr,
+    }
+
+
+def pick(columns, i):
+    """从列式输入 / 批量结果中取出第 i 行，得到标量字典 (供动画使用)"""
+    return {k: np.asarray(v)[i].item() if np.ndim(v) else v for k, v in columns.items()}
+
+
+def screen_one(record):
+    """单个患者 (self.data 格式的字典) -> 标量结果字典，与批量计算走同一代码路径"""
+    return {k: np.asarray(v).item() for k, v in screen(**record).items()}
@@ -0,0 +1,153 @@
+"""T21 筛查性能 Monte Carlo: 合成孕妇 -> 批量风险 (t21_engine.screen) -> 各切割值下的检出率 / 假阳性率
+
+示例:
+    python t21_montecarlo.py -n 10000000 -j 8 --seed 1
+    python t21_montecarlo.py --age-mix ages.csv --cutoff 250    # ages.csv: age,count 两列
+结果只与 --seed 和 --chunk-rows 有关，与进程数无关。
+"""
+import argparse
+import csv
+import os
+
+import numpy as np
+
+import t21_engine
+import t21_mvn
+import t21_tables
+
+# 风险切割值 1:N 中的 N，风险 >= 1:N (即 risk_denom <= N) 判为阳性
+CUTOFFS = np.unique(np.concatenate([np.geomspace(10, 10000, 121).round(), [250]]))
+DEFAULT_CUTOFF = 250
+# 孕 15w0d - 19w6d 均匀分布
+GA_DAYS = (105, 140)
+# 体重 (kg) 正态分布，经体重校正后回到模型的 MoM
+WEIGHT_MEAN, WEIGHT_STD = 65.0, 12.0
+MARKERS = ("afp", "hcg")
+
+
+def default_age_mix():
+    """示例人群年龄构成: 15-49 岁，均值约 30 岁的截断正态"""
+    ages = np.arange(15, 50)
+    weights = np.exp(-0.5 * ((ages - 30.0) / 5.5) ** 2)
+    return ages, weights / weights.sum()
+
+
+def read_age_mix(path):
+    """age,count 两列的 CSV -> (ages, 归一化权重)"""
+    with open(path, newline="") as f:
+        rows = [(float(r["age"]), float(r["count"])) for r in csv.DictReader(f)]
+    ages, counts = np.array(rows).T
+    return ages, counts / counts.sum()
+
+
+def affected_age_mix(ages, weights, tables):
+    """患病孕妇的年龄分布: 人群构成 x 年龄患病率 (先验 1:N -> 1 / (1 + N))"""
+    w = weights / (1.0 + tables.prior_denom(ages))
+    return w / w.sum()
+
+
+def _sample_log_mom(rng, group, weeks, model):
+    """按孕周桶从 (未)患病组的二元高斯抽 log10 MoM，(N, 2)"""
+    out = np.empty((len(weeks), len(MARKERS)))
+    sel = [t21_mvn.MARKERS.index(m) for m in MARKERS]
+    buckets = model.bucket(weeks)
+    for week in np.unique(buckets):
+        rows = np.flatnonzero(buckets == week)
+        mean, cov = model.table[int(week)][group]
+        mean = np.asarray(mean, dtype=float)[sel]
+        chol = np.linalg.cholesky(np.asarray(cov, dtype=float)[np.ix_(sel, sel)])
+        out[rows] = mean + rng.standard_normal((len(rows), len(MARKERS))) @ chol.T
+    return out
+
+
+def simulate_group(rng, n, group, ages, age_weights, cutoffs=CUTOFFS, model=None, tables=None):
+    """抽样 n 名孕妇并走完整批量风险流程，返回各切割值下的阳性数 (len(cutoffs),)
+
+    原始浓度由 MoM 反推: value = MoM * 中位数(孕日) / 体重校正因子，
+    再交给 t21_engine.screen，与真实患者走同一代码路径。
+    """
+    model = model or t21_mvn.default_model
+    tables = tables or t21_tables.default_tables()
+    age = rng.choice(ages, size=n, p=age_weights)
+    ga_day = rng.integers(*GA_DAYS, size=n)
+    weight = np.clip(rng.normal(WEIGHT_MEAN, WEIGHT_STD, n), 35.0, 150.0)
+    mom = 10.0 ** _sample_log_mom(rng, group, ga_day // 7, model)
+    factor = t21_engine.weight_factor(weight)
+    val_afp = mom[:, 0] * tables.median("afp", ga_day) / factor
+    val_hcg = mom[:, 1] * tables.median("hcg", ga_day) / factor
+    risk_denom = t21_engine.screen(age, weight, val_afp, val_hcg, ga_day=ga_day, model=model,
+                                   tables=tables)["risk_denom"]
+    return np.searchsorted(np.sort(risk_denom), cutoffs, side="right")
+
+
+def _simulate_chunk(task):
+    seed, n, group, ages, age_weights, cutoffs = task
+    return group, simulate_group(np.random.default_rng(seed), n, group, ages, age_weights, cutoffs)
+
+
+def simulate(n=1_000_000, cutoffs=CUTOFFS, age_mix=None, seed=0, workers=None, chunk_rows=500_000):
+    """每组 (患病 / 未患病) 各抽 n 例，返回 DR / FPR 曲线
+
+    按 chunk_rows 切块，每块一个由 SeedSequence(seed) 派生的独立随机流，
+    结果可复现且与进程数无关。返回字典:
+        cutoffs, dr, fpr (均为 (len(cutoffs),)), n_affected, n_unaffected
+    """
+    cutoffs = np.asarray(cutoffs, dtype=float)
+    tables = t21_tables.default_tables()
+    ages, weights = age_mix if age_mix is not None else default_age_mix()
+    mixes = {"unaffected": weights, "affected": affected_age_mix(ages, weights, tables)}
+
+    sizes = [min(chunk_rows, n - start) for start in range(0, n, chunk_rows)]
+    seeds = np.random.SeedSequence(seed).spawn(2 * len(sizes))
+    tasks = [(seeds[2 * i + g], size, group, ages, mixes[group], cutoffs)
+             for i, size in enumerate(sizes) for g, group in enumerate(("unaffected", "affected"))]
+
+    positives = {"unaffected": np.zeros(len(cutoffs), dtype=np.int64),
+                 "affected": np.zeros(len(cutoffs), dtype=np.int64)}
+    if workers == 1 or len(tasks) <= 2:
+        results = list(map(_simulate_chunk, tasks))
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    for group, counts in results:
+        positives[group] += counts
+    return {"cutoffs": cutoffs, "dr": positives["affected"] / n, "fpr": positives["unaffected"] / n,
+            "n_affected": n, "n_unaffected": n}
+
+
+def at_cutoff(result, cutoff=DEFAULT_CUTOFF):
+    """指定切割值 (1:cutoff) 下的 (DR, FPR)，不在网格上时按 log 切割值插值"""
+    x = np.log(result["cutoffs"])
+    return (float(np.interp(np.log(cutoff), x, result["dr"])),
+            float(np.interp(np.log(cutoff), x, result["fpr"])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo detection / false-positive rates of T21 screening")
+    parser.add_argument("-n", "--samples", type=int, default=1_000_000, help="pregnancies per group")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--age-mix", help="CSV with age,count columns (default: built-in example mix)")
+    parser.add_argument("--cutoff", type=float, default=DEFAULT_CUTOFF, help="report DR/FPR at risk 1:CUTOFF")
+    parser.add_argument("--output", help="write the full curves to this CSV")
+    args = parser.parse_args(argv)
+
+    age_mix = read_age_mix(args.age_mix) if args.age_mix else None
+    result = simulate(args.samples, age_mix=age_mix, seed=args.seed, workers=args.workers,
+                      chunk_rows=args.chunk_rows)
+    dr, fpr = at_cutoff(result, args.cutoff)
+    print(f"1:{args.cutoff:g}  DR = {dr:.2%}  FPR = {fpr:.2%}  (n = {args.samples} per group)")
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["cutoff", "dr", "fpr"])
+            writer.writerows(zip(result["cutoffs"], result["dr"], result["fpr"]))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
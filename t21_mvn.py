@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+
+MARKERS = ("afp", "hcg", "ue3", "inhibin", "nt")
+
+_LOG_2PI = math.log(2 * math.pi)
+
+
+def _cov(std, corr):
+    std = np.asarray(std, dtype=float)
+    return np.asarray(corr, dtype=float) * np.outer(std, std)
+
+
+# 示例参数 (log10 MoM)，顺序同 MARKERS; hCG 的边缘分布与 gaussian_analysis_scene 保持一致
+_CORR_UNAFFECTED = [
+    [1.00, 0.08, 0.25, 0.15, 0.00],
+    [0.08, 1.00, -0.02, 0.35, 0.00],
+    [0.25, -0.02, 1.00, -0.04, 0.00],
+    [0.15, 0.35, -0.04, 1.00, 0.00],
+    [0.00, 0.00, 0.00, 0.00, 1.00],
+]
+_CORR_AFFECTED = [
+    [1.00, 0.12, 0.20, 0.10, 0.00],
+    [0.12, 1.00, -0.05, 0.40, 0.00],
+    [0.20, -0.05, 1.00, 0.00, 0.00],
+    [0.10, 0.40, 0.00, 1.00, 0.00],
+    [0.00, 0.00, 0.00, 0.00, 1.00],
+]
+DEFAULT_PARAMS = {
+    "unaffected": ([0.0, 0.0, 0.0, 0.0, 0.0], _cov([0.13, 0.15, 0.12, 0.19, 0.11], _CORR_UNAFFECTED)),
+    "affected": ([-0.12, 0.30, -0.13, 0.26, 0.30], _cov([0.14, 0.18, 0.13, 0.21, 0.21], _CORR_AFFECTED)),
+}
+# 孕周 -> 参数; 超出范围的孕周归入最近的桶
+DEFAULT_TABLE = {week: DEFAULT_PARAMS for week in range(15, 21)}
+DEFAULT_WEEK = 16
+
+
+class MVNModel:
+    """多标志物高斯 LR: 每个 (孕周桶, 标志物组合) 只做一次 Cholesky 分解并缓存
+
+    批量计算时按孕周分组，每组一次矩阵运算求马氏距离，不对单个患者求逆。
+    标志物子集 (例如缺 NT) 直接取协方差的子矩阵，即边缘分布。
+    """
+
+    def __init__(self, table=None):
+        self.table = DEFAULT_TABLE if table is None else table
+        self.weeks = np.array(sorted(self.table))
+        self._factors = {}
+
+    def bucket(self, week):
+        """孕周 -> 参数表中最近的桶"""
+        week = np.asarray(week)
+        if len(self.weeks) == 1:
+            return np.full(np.shape(week), self.weeks[0])
+        pos = np.clip(np.searchsorted(self.weeks, week), 1, len(self.weeks) - 1)
+        lower, upper = self.weeks[pos - 1], self.weeks[pos]
+        return np.where(week - lower <= upper - week, lower, upper)
+
+    def _factor(self, week, markers):
+        key = (int(week), markers)
+        if key not in self._factors:
+            sel = [MARKERS.index(m) for m in markers]
+            factors = []
+            for group in ("unaffected", "affected"):
+                mean, cov = self.table[week][group]
+                mean = np.asarray(mean, dtype=float)[sel]
+                chol = np.linalg.cholesky(np.asarray(cov, dtype=float)[np.ix_(sel, sel)])
+                # 存 L^-1 与 log|Sigma|，之后每组只需一次矩阵乘法
+                inv_chol = np.linalg.inv(chol)
+                log_det = 2.0 * np.log(np.diag(chol)).sum()
+                factors.append((mean, inv_chol, log_det))
+            self._factors[key] = factors
+        return self._factors[key]
+
+    def _log_pdf(self, x, mean, inv_chol, log_det):
+        z = (x - mean) @ inv_chol.T
+        return -0.5 * (np.einsum("ij,ij->i", z, z) + log_det + len(mean) * _LOG_2PI)
+
+    def log_lr(self, log_mom, week=DEFAULT_WEEK, markers=MARKERS):
+        """log(LR) = log f_affected(x) - log f_unaffected(x)
+
+        log_mom: (N, len(markers)) 的 log10 MoM 矩阵
+        week: 标量或 (N,) 孕周
+        """
+        x = np.atleast_2d(np.asarray(log_mom, dtype=float))
+        markers = tuple(markers)
+        buckets = np.broadcast_to(self.bucket(week), (len(x),))
+        out = np.empty(len(x))
+        for w in np.unique(buckets):
+            rows = np.flatnonzero(buckets == w)
+            (mu_u, l_u, det_u), (mu_a, l_a, det_a) = self._factor(w, markers)
+            out[rows] = self._log_pdf(x[rows], mu_a, l_a, det_a) - self._log_pdf(x[rows], mu_u, l_u, det_u)
+        return out
+
+    def lr(self, log_mom, week=DEFAULT_WEEK, markers=MARKERS):
+        return np.exp(self.log_lr(log_mom, week, markers))
+
+
+default_model = MVNModel()
@@ -0,0 +1,86 @@
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# 标志物中位数回归: log10(median) = a + b * (GA_day - 112)，112 天 = 16 周
+MEDIAN_REGRESSION = {
+    "afp": (np.log10(35.0), 0.0084),
+    "hcg": (np.log10(30.0), -0.0100),
+}
+GA_DAYS = (98, 161)  # 14w0d - 22w6d，逐日
+
+# 孕妇年龄先验 (Cuckle 公式): P = 0.000627 + exp(-16.2395 + 0.286 * (age - 0.5))
+AGE_PRIOR = (0.000627, -16.2395, 0.286)
+AGES = (15.0, 50.0, 0.1)  # 0.1 岁分辨率
+
+CACHE_PATH = os.environ.get(
+    "T21_TABLE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "manim_bioAlg", "t21_tables.npz"))
+
+
+def _params_key():
+    params = {"median": {k: list(map(float, v)) for k, v in MEDIAN_REGRESSION.items()},
+              "ga_days": GA_DAYS, "age_prior": AGE_PRIOR, "ages": AGES}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class T21Tables:
+    """预计算的稠密查找表: 标志物中位数 (按孕日) 与年龄先验 (按 0.1 岁)
+
+    查表用 np.interp (二分定位 + 线性插值)，批量筛查不再逐人计算回归。
+    """
+
+    def __init__(self, ga_day, medians, age, prior_denom):
+        self.ga_day = ga_day
+        self.medians = medians
+        self.age = age
+        self.prior_denom_table = prior_denom
+
+    @classmethod
+    def build(cls):
+        ga_day = np.arange(GA_DAYS[0], GA_DAYS[1] + 1, dtype=float)
+        medians = {m: 10 ** (a + b * (ga_day - 112)) for m, (a, b) in MEDIAN_REGRESSION.items()}
+        age = np.arange(AGES[0], AGES[1] + AGES[2] / 2, AGES[2])
+        base, c0, c1 = AGE_PRIOR
+        prior_denom = 1.0 / (base + np.exp(c0 + c1 * (age - 0.5)))
+        return cls(ga_day, medians, age, prior_denom)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 每个进程各用一个临时文件 (spawn 工作进程可能同时重建缓存)，os.replace 保证读者只看到完整文件
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, key=_params_key(), ga_day=self.ga_day, age=self.age, prior_denom=self.prior_denom_table,
+                     **{f"median_{m}": v for m, v in self.medians.items()})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        """读取二进制缓存; 缓存缺失或参数已变化时重新生成并写回"""
+        try:
+            with np.load(path) as f:
+                if str(f["key"]) == _params_key():
+                    medians = {m: f[f"median_{m}"] for m in MEDIAN_REGRESSION}
+                    return cls(f["ga_day"], medians, f["age"], f["prior_denom"])
+        except (OSError, KeyError, ValueError):
+            pass
+        tables = cls.build()
+        try:
+            tables.save(path)
+        except OSError:
+            pass
+        return tables
+
+    def median(self, marker, ga_day):
+        return np.interp(ga_day, self.ga_day, self.medians[marker])
+
+    def prior_denom(self, age):
+        """年龄先验风险 1 : N 中的 N"""
+        return np.interp(age, self.age, self.prior_denom_table)
+
+
+@functools.lru_cache(maxsize=None)
+def default_tables():
+    return T21Tables.load()
@@ -0,0 +1,37 @@
+import csv
+
+import numpy as np
+
+import biomarker_filter
+
+
+def _write(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+def test_non_numeric_marker_value_counts_as_missing(tmp_path):
+    # "<0.6" 之类的检验报告值无法解析，场景与 CLI 都应把它当作缺失
+    path = tmp_path / "lt.csv"
+    _write(path, [["ID", "Age", "CA199", "CEA", "CA125"],
+                  ["P001", "45", "37.5", "<0.6", "12.0"],
+                  ["P002", "62", "<0.6", "NaN", "8.5"],
+                  ["P003", "58", "120.4", "8.1", "NaN"]])
+
+    headers, columns = biomarker_filter.read_table(str(path))
+    assert columns["CEA"].dtype.kind == "f"
+    result = biomarker_filter.preprocess(columns, biomarker_filter.check_markers(headers))
+    assert result["keep"].tolist() == [True, False, True]
+    assert result["counts"].tolist() == [2, 1, 2]
+
+    summary = biomarker_filter.run(str(path), str(tmp_path / "out" / "lt"))
+    assert summary == {"rows": 3, "kept": 2, "dropped": 1}
+    with open(tmp_path / "out" / "lt.clean.csv", newline="") as f:
+        clean = list(csv.reader(f))
+    # clean.csv 原样保留原始文本
+    assert clean[1] == ["P001", "45", "37.5", "<0.6", "12.0"]
+
+
+def test_preprocess_accepts_string_marker_columns():
+    columns = {"CA199": np.array(["1.0", "<0.6"]), "CEA": np.array(["2.0", "3.0"]), "CA125": np.array(["", "x"])}
+    assert biomarker_filter.valid_counts(columns).tolist() == [2, 1]
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+from manim import DEFAULT_FONT_SIZE, NORMAL, Text
+
+
+def _freeze(value):
+    """把 t2c / t2w 等字典、列表参数转成可哈希的键"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+class TextCache:
+    """Text 字形的 LRU 缓存
+
+    以 (字符串, 字体, 字号, 字重, 其他排版参数) 为键，只在第一次时做字体排版和 SVG 解析，
+    之后返回模板的副本。颜色不影响字形，在副本上设置。
+    """
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+
+    def __call__(self, text, font_size=DEFAULT_FONT_SIZE, font="", weight=NORMAL, color=None, **kwargs):
+        key = (text, font, font_size, weight, _freeze(sorted(kwargs.items())))
+        try:
+            template = self._templates.get(key)
+        except TypeError:
+            # 仍有不可哈希的参数 (如颜色对象): 不缓存，直接排版
+            self.misses += 1
+            copy = Text(text, font_size=font_size, font=font, weight=weight, **kwargs)
+            if color is not None:
+                copy.set_color(color)
+            return copy
+        if template is None:
+            self.misses += 1
+            template = Text(text, font_size=font_size, font=font, weight=weight, **kwargs)
+            self._templates[key] = template
+            if len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        else:
+            self.hits += 1
+            self._templates.move_to_end(key)
+        copy = template.copy()
+        if color is not None:
+            copy.set_color(color)
+        return copy
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._templates), "maxsize": self.maxsize}
+
+    def clear(self):
+        self._templates.clear()
+        self.hits = self.misses = 0
+
+
+cached_text = TextCache()
@@ -0,0 +1,184 @@
+import json
+
+import numpy as np
+
+
+# base_score 以输出空间保存，按目标函数的链接函数换回 margin 空间; 预测时再做反变换
+LOGIT_OBJECTIVES = ("binary:logistic", "reg:logistic")
+LOG_OBJECTIVES = ("count:poisson", "reg:gamma", "reg:tweedie", "survival:cox", "survival:aft")
+# 输出 0/1 类别，margin 与 base_score 同一空间
+HINGE_OBJECTIVES = ("binary:hinge",)
+
+
+def _parse_float(value):
+    # base_score 在新版 JSON 中可能是 "[5E-1]" 形式
+    return float(str(value).strip("[]"))
+
+
+class FlatForest:
+    """XGBoost JSON 模型展平成连续数组，整批样本一起向量化遍历
+
+    所有树的节点拼接在同一组数组里，roots[t] 为第 t 棵树根节点的全局下标。
+    分裂规则与 XGBoost 一致: x < threshold 走左，缺失值走 default_left 方向。
+    """
+
+    def __init__(self, left, right, feature, threshold, default_left, value, cover, roots, base_margin,
+                 feature_names, objective, num_feature=None):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.cover = cover
+        self.roots = roots
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+        self.objective = objective
+        self.num_feature = num_feature
+        self.is_leaf = left < 0
+        self.depth = self._max_depth()
+
+    @classmethod
+    def load(cls, path):
+        """读取 booster.save_model("model.json") 保存的模型，不需要安装 xgboost"""
+        with open(path) as f:
+            learner = json.load(f)["learner"]
+        objective = learner["objective"]["name"]
+        params = learner["learner_model_param"]
+        # 多分类 / 多输出模型每个样本有多个 margin (base_score 为逗号分隔的向量)，这里只展平单输出模型
+        if objective.startswith("multi:") or int(params.get("num_class", 0)) > 1 \
+                or int(params.get("num_target", 1)) > 1:
+            raise ValueError(f"unsupported objective {objective!r}: only single-output models are supported")
+        trees = learner["gradient_booster"]["model"]["trees"]
+        base_score = _parse_float(params["base_score"])
+        if objective in LOGIT_OBJECTIVES:
+            base_margin = float(np.log(base_score / (1 - base_score)))
+        elif objective in LOG_OBJECTIVES:
+            base_margin = float(np.log(base_score))
+        else:
+            base_margin = base_score
+
+        left, right, feature, threshold, default_left, value, cover, roots = [], [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("categorical splits are not supported")
+            l = np.asarray(tree["left_children"], dtype=np.int32)
+            r = np.asarray(tree["right_children"], dtype=np.int32)
+            # 叶子节点的 split_conditions 即叶子值
+            leaf = l < 0
+            left.append(np.where(leaf, -1, l + offset))
+            right.append(np.where(leaf, -1, r + offset))
+            feature.append(np.asarray(tree["split_indices"], dtype=np.int32))
+            threshold.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            value.append(np.where(leaf, np.asarray(tree["split_conditions"], dtype=np.float64), 0.0))
+            # 节点样本权重 (hessian 和)，TreeSHAP 需要
+            cover.append(np.asarray(tree["sum_hessian"], dtype=np.float64))
+            roots.append(offset)
+            offset += len(l)
+        return cls(np.concatenate(left), np.concatenate(right), np.concatenate(feature), np.concatenate(threshold),
+                   np.concatenate(default_left), np.concatenate(value), np.concatenate(cover),
+                   np.asarray(roots, dtype=np.int32), base_margin, learner.get("feature_names", []), objective,
+                   int(params.get("num_feature", 0)) or None)
+
+    def _max_depth(self):
+        depth = 0
+        nodes = self.roots
+        while len(nodes):
+            nodes = nodes[~self.is_leaf[nodes]]
+            nodes = np.concatenate([self.left[nodes], self.right[nodes]])
+            depth += 1
+        return depth
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_features(self):
+        # 没有特征名时以 num_feature 为准 (末尾未被分裂用到的特征也占位)
+        return len(self.feature_names) or self.num_feature or int(self.feature[~self.is_leaf].max(initial=-1)) + 1
+
+    def leaf_nodes(self, x):
+        """(N, n_features) -> (N, n_trees) 每棵树落入的叶子节点下标"""
+        x = np.asarray(x, dtype=np.float32)
+        rows = np.arange(len(x))[:, None]
+        node = np.broadcast_to(self.roots, (len(x), self.n_trees)).copy()
+        for _ in range(self.depth):
+            inner = ~self.is_leaf[node]
+            if not inner.any():
+                break
+            fval = x[rows, self.feature[node]]
+            go_left = np.where(np.isnan(fval), self.default_left[node], fval < self.threshold[node])
+            node = np.where(inner, np.where(go_left, self.left[node], self.right[node]), node)
+        return node
+
+    def leaf_values(self, x, chunk_rows=65536):
+        """每棵树对每个样本的贡献 (叶子值)，(N, n_trees)"""
+        x = np.asarray(x, dtype=np.float32)
+        out = np.empty((len(x), self.n_trees))
+        for start in range(0, len(x), chunk_rows):
+            out[start:start + chunk_rows] = self.value[self.leaf_nodes(x[start:start + chunk_rows])]
+        return out
+
+    def predict_margin(self, x, chunk_rows=65536):
+        """整批 logits = base_margin + Sum(TreeScores)"""
+        x = np.asarray(x, dtype=np.float32)
+        out = np.empty(len(x))
+        for start in range(0, len(x), chunk_rows):
+            out[start:start + chunk_rows] = self.base_margin + self.leaf_values(x[start:start + chunk_rows]).sum(1)
+        return out
+
+    def predict(self, x, chunk_rows=65536):
+        margin = self.predict_margin(x, chunk_rows)
+        if self.objective in LOGIT_OBJECTIVES:
+            return 1.0 / (1.0 + np.exp(-margin))
+        if self.objective in LOG_OBJECTIVES:
+            return np.exp(margin)
+        if self.objective in HINGE_OBJECTIVES:
+            return (margin > 0).astype(float)
+        return margin
+
+    def feature_columns(self, columns, id_column="ID"):
+        """模型各特征对应的列名
+
+        模型保存时没有特征名 (feature_names 为空) 则按位置取除 ID 外的数值列，列数必须与模型一致。
+        """
+        if self.feature_names:
+            return list(self.feature_names)
+        numeric = [h for h, v in columns.items() if h != id_column and np.asarray(v).dtype.kind in "biuf"]
+        if len(numeric) != self.n_features:
+            raise ValueError(f"model has no feature names and expects {self.n_features} features, "
+                             f"but the table has {len(numeric)} numeric columns: {', '.join(numeric)}")
+        return numeric
+
+    def features_from_columns(self, columns, rows=None, id_column="ID"):
+        """列字典 (biomarker_filter 格式) -> 模型特征矩阵，缺少的列填 NaN"""
+        n = len(next(iter(columns.values())))
+        rows = np.arange(n) if rows is None else np.atleast_1d(rows)
+        x = np.full((len(rows), self.n_features), np.nan, dtype=np.float32)
+        for j, name in enumerate(self.feature_columns(columns, id_column)):
+            if name in columns:
+                x[:, j] = columns[name][rows]
+        return x
+
+    def explain_row(self, x_row, top_n=3):
+        """单个样本的前 top_n 棵贡献最大的树及其根节点分裂，供动画绘制"""
+        contributions = self.leaf_values(np.asarray(x_row, dtype=np.float32)[None, :])[0]
+        order = np.argsort(-np.abs(contributions), kind="stable")[:top_n]
+        trees = []
+        for t in order:
+            root = self.roots[t]
+            name = self.feature_names[self.feature[root]] if self.feature_names else f"f{self.feature[root]}"
+            fval = x_row[self.feature[root]]
+            trees.append({
+                "name": f"Tree {t + 1}",
+                "split": None if self.is_leaf[root] else f"{name} < {self.threshold[root]:.3g}",
+                "path_left": bool(self.default_left[root] if np.isnan(fval) else fval < self.threshold[root]),
+                "score": float(contributions[t]),
+            })
+        rest = float(contributions.sum() - contributions[order].sum())
+        return {"base": self.base_margin, "trees": trees, "rest": rest,
+                "logit": self.base_margin + float(contributions.sum())}
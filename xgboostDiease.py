@@ -1,32 +1,140 @@
 from manim import *
+import functools
+import numpy as np
 import random
 
+from async_writer import AsyncFileWriter
+import biomarker_filter
+from frame_skip import FrameDiffMixin
+from keyframes import KeyframeMixin
+from profiling import ProfileMixin
+from render_cache import SectionCacheMixin
+from scene_template import TemplateMixin
+from text_cache import cached_text
+from xgb_engine import FlatForest
+
+DEMO_HEADERS = ["ID", "Age", "CA199", "CEA", "CA125"]
+DEMO_ROWS = [
+    ["P001", "45", "37.5", "5.2", "12.0"],
+    ["P002", "62", "NaN", "NaN", "8.5"],
+    ["P003", "58", "120.4", "8.1", "NaN"],
+    ["P004", "33", "NaN", "2.1", "NaN"],
+]
+# 没有模型文件时的示意树 (与 FlatForest.explain_row 返回格式相同)
+DEMO_ENSEMBLE = {
+    "base": 0.0,
+    "trees": [
+        {"name": "Tree 1", "split": None, "path_left": False, "score": 0.5},
+        {"name": "Tree 2", "split": None, "path_left": False, "score": 0.3},
+        {"name": "Tree 3", "split": None, "path_left": False, "score": 0.1},
+    ],
+    "rest": 0.0,
+    "logit": 0.9,
+}
+# 没有模型文件时的示意 SHAP 力图
+DEMO_FORCE = {
+    "base": 0.1,
+    "contribs": [("CA199 = High", 0.5), ("Age = 35", -0.1), ("CEA = High", 0.4)],
+    "high_risk": True,
+}
+
+
+# 模板模式下同一进程连续渲染多个患者，患者表与模型只读取一次
+_read_table = functools.lru_cache(maxsize=4)(biomarker_filter.read_table)
+_load_forest = functools.lru_cache(maxsize=4)(FlatForest.load)
+
+
+class XGBoostShapViz(ProfileMixin, KeyframeMixin, FrameDiffMixin, TemplateMixin, SectionCacheMixin, Scene):
+    # 光栅化与编码并行 (encoder_pool 常驻编码进程)
+    file_writer_class = AsyncFileWriter
+    # 患者表 (CSV 路径或 DataFrame)，为 None 时使用上面的四行示例
+    cohort = None
+    # 表格一次显示的行数，其余行只汇总
+    visible_rows = 4
+    # 参与 Count(Biomarkers) 的标志物列
+    markers = biomarker_filter.MARKERS
+    # booster.save_model 保存的 JSON 模型; 为 None 时画示意树
+    model_path = None
+    # 要讲解的患者 ID，为 None 时取筛选后保留的第一行
+    patient_id = None
+    top_trees = 3
+    # 力图中显示的特征个数 (按 |SHAP| 排序)
+    top_features = 3
 
-class XGBoostShapViz(Scene):
     def construct(self):
         # 1. 数据清洗场景 (优化布局版)
-        self.data_cleaning_scene()
+        headers, columns = self.load_cohort()
+        self.cached_section(self.data_cleaning_scene, headers, columns,
+                            inputs=(headers, columns, self.visible_rows, self.markers),
+                            deps=(self.table_header, self.build_table_row))
+
+        ensemble, force = DEMO_ENSEMBLE, DEMO_FORCE
+        if self.model_path is not None:
+            ensemble, force = self.explain_patient(headers, columns)
 
         # 2. XGBoost 原理场景
-        self.xgboost_logic_scene()
+        self.cached_section(self.xgboost_logic_scene, ensemble, inputs=ensemble, deps=(self.tree_skeleton,))
 
         # 3. SHAP 解释性场景
-        self.shap_force_scene()
+        self.cached_section(self.shap_force_scene, force, inputs=force)
+
+    def load_cohort(self):
+        if isinstance(self.cohort, str):
+            return _read_table(self.cohort, tuple(self.markers))
+        if self.cohort is not None:
+            return biomarker_filter.read_table(self.cohort, self.markers)
+        return biomarker_filter.from_rows(DEMO_HEADERS, DEMO_ROWS)
 
-    def data_cleaning_scene(self):
+    def table_header(self, headers, start_pos, col_spacing):
+        header_group = VGroup()
+        for i, h in enumerate(headers):
+            # i=0是ID, 放在最左边。后续列依次向右
+            pos = start_pos + RIGHT * (i * col_spacing) + UP * 1.5
+            t = cached_text(h, font_size=28, weight=BOLD).move_to(pos)
+            header_group.add(t)
+        return header_group
+
+    def tree_skeleton(self):
+        """一棵树的静态骨架 (连线、根、左右子节点)，以 ORIGIN 为基准"""
+        root = Circle(radius=0.4, color=WHITE).move_to(UP)
+        left = Circle(radius=0.4, color=WHITE).move_to(LEFT * 1.2 + DOWN * 0.8)
+        right = Circle(radius=0.4, color=WHITE).move_to(RIGHT * 1.2 + DOWN * 0.8)
+        lines = VGroup(Line(root.get_bottom(), left.get_top()), Line(root.get_bottom(), right.get_top()))
+        return VGroup(lines, root, left, right)
+
+    def build_table_row(self, headers, columns, r_idx, y, start_pos, col_spacing):
+        r_group = VGroup()
+        for c_idx, h in enumerate(headers):
+            pos = start_pos + RIGHT * (c_idx * col_spacing) + UP * y
+            if h == biomarker_filter.ID_COLUMN:
+                t = cached_text(str(columns[h][r_idx]), font_size=28, color=YELLOW).move_to(pos)
+            elif columns[h].dtype.kind != "f":
+                # 文本列原样显示
+                t = cached_text(str(columns[h][r_idx]), font_size=28).move_to(pos)
+            else:
+                val = columns[h][r_idx]
+                color = WHITE
+                if np.isnan(val):
+                    color = RED_A
+                elif h in self.markers:
+                    color = GREEN_A
+                t = cached_text(f"{val:g}" if not np.isnan(val) else "NaN", font_size=28, color=color).move_to(pos)
+            r_group.add(t)
+        return r_group
+
+    def data_cleaning_scene(self, headers, columns):
         # === 标题 ===
-        title = Text("Step 1: Data Preprocessing", font_size=40, color=BLUE).to_edge(UP)
-        subtitle = Text("Filtering samples with only 1 biomarker", font_size=24, color=GRAY).next_to(title, DOWN)
+        title = cached_text("Step 1: Data Preprocessing", font_size=40, color=BLUE).to_edge(UP)
+        subtitle = cached_text("Filtering samples with only 1 biomarker", font_size=24, color=GRAY).next_to(title, DOWN)
         self.play(Write(title), FadeIn(subtitle))
 
-        # === 表格构建 ===
-        headers = ["ID", "Age", "CA199", "CEA", "CA125"]
-        rows_data = [
-            ["P001", "45", "37.5", "5.2", "12.0"],
-            ["P002", "62", "NaN", "NaN", "8.5"],
-            ["P003", "58", "120.4", "8.1", "NaN"],
-            ["P004", "33", "NaN", "2.1", "NaN"],
-        ]
+        # === 筛选在整张表上一次完成 (与模型输入同一预处理) ===
+        markers = biomarker_filter.check_markers(headers, self.markers)
+        result = biomarker_filter.preprocess(columns, markers)
+        counts, keep = result["counts"], result["keep"]
+        n_rows = len(counts)
+        # 只为可见窗口内的行创建 mobject，其余行只做汇总
+        n_visible = min(self.visible_rows, n_rows)
 
         # 创建一个组来包含整个表格
         table_group = VGroup()
@@ -36,104 +144,118 @@ class XGBoostShapViz(Scene):
         col_spacing = 2.2
         row_height = 0.8
 
-        # 1. 绘制表头
-        header_group = VGroup()
-        for i, h in enumerate(headers):
-            # i=0是ID, 放在最左边。后续列依次向右
-            pos = start_pos + RIGHT * (i * col_spacing) + UP * 1.5
-            t = Text(h, font_size=28, weight=BOLD).move_to(pos)
-            header_group.add(t)
+        # 1. 绘制表头 (整个队列的所有患者相同，每个进程只排版一次)
+        header_group = self.template(("xgb_table_header", tuple(headers)),
+                                     lambda: self.table_header(headers, start_pos, col_spacing))
         table_group.add(header_group)
 
-        # 2. 绘制数据行
+        # 2. 绘制可见窗口内的数据行
         row_mobjects = []
-        for r_idx, row in enumerate(rows_data):
-            r_group = VGroup()
-            valid_count = 0
-
-            # 每一行的Y坐标
-            current_y = UP * 1.5 - (r_idx + 1) * row_height
-
-            # ID 列 (Row[0])
-            id_pos = start_pos + RIGHT * (0 * col_spacing) + UP * current_y[1]
-            id_t = Text(row[0], font_size=28, color=YELLOW).move_to(id_pos)
-            r_group.add(id_t)
-
-            # 数据列 (Row[1:])
-            # 注意：row数据里 ID是index 0, Age是index 1...
-            for c_idx, val in enumerate(row[1:]):
-                # c_idx 0 -> Age (header index 1)
-                # c_idx 1 -> CA199 (header index 2) ...
-                header_index = c_idx + 1
-
-                color = WHITE
-                if val == "NaN":
-                    color = RED_A
-                # 标志物是 CA199(idx 2), CEA(idx 3), CA125(idx 4)
-                # 对应的 header_index 是 2, 3, 4
-                elif header_index >= 2:
-                    valid_count += 1
-                    color = GREEN_A
-
-                pos = start_pos + RIGHT * (header_index * col_spacing) + UP * current_y[1]
-                t = Text(val, font_size=28, color=color).move_to(pos)
-                r_group.add(t)
-
-            r_group.valid_count = valid_count
+        for r_idx in range(n_visible):
+            r_group = self.build_table_row(headers, columns, r_idx, 1.5 - (r_idx + 1) * row_height, start_pos,
+                                           col_spacing)
             row_mobjects.append(r_group)
             table_group.add(r_group)
 
         # === 关键修复：整体缩放并居中 ===
         # 这样无论你的字有多大，都会被缩放到屏幕中间合适的大小
         table_group.scale(0.8).move_to(ORIGIN)
+        # 列数多时按画面宽度缩小并左移，右侧留出 Count 标签与勾叉 (约 3 个单位) 的位置
+        max_width = config.frame_width - 4
+        if table_group.width > max_width:
+            table_group.scale_to_fit_width(max_width).move_to(LEFT * 1.5)
+
+        hidden = n_rows - n_visible
+        more = VGroup()
+        if hidden:
+            more = cached_text(f"... {hidden:,} more rows", font_size=24, color=GRAY).next_to(table_group, DOWN)
 
-        self.play(Create(table_group), run_time=2)
+        self.play(Create(table_group), FadeIn(more), run_time=2)
         self.wait(1)
 
         # === 筛选逻辑文字 ===
-        logic_text = Text("Count(Biomarkers) > 1", font_size=36, color=YELLOW).to_edge(UP).shift(DOWN * 1.5)
+        logic_text = cached_text("Count(Biomarkers) > 1", font_size=36, color=YELLOW).to_edge(UP).shift(DOWN * 1.5)
         self.play(Write(logic_text))
 
-        for row_obj in row_mobjects:
+        # 可见窗口一次性播放，而不是每行一组 self.play
+        count_labels = VGroup()
+        marks = VGroup()
+        dropped = VGroup()
+        for r_idx, row_obj in enumerate(row_mobjects):
             # 标签放在该行的右侧
-            count_label = Text(f"Count: {row_obj.valid_count}", font_size=24, color=ORANGE)
+            count_label = cached_text(f"Count: {counts[r_idx]}", font_size=24, color=ORANGE)
             count_label.next_to(row_obj, RIGHT, buff=0.5)
+            count_labels.add(count_label)
+            if keep[r_idx]:
+                marks.add(cached_text("✔", color=GREEN, font_size=30).next_to(count_label, RIGHT))
+            else:
+                cross = Cross(row_obj, color=RED)
+                marks.add(cross)
+                dropped.add(row_obj, cross)
 
-            self.play(FadeIn(count_label), run_time=0.3)
+        self.play(LaggedStart(*[FadeIn(l) for l in count_labels], lag_ratio=0.3))
+        self.play(LaggedStart(*[Create(m) if isinstance(m, Cross) else FadeIn(m) for m in marks], lag_ratio=0.3))
+        self.play(FadeOut(dropped), FadeOut(count_labels), FadeOut(marks), run_time=0.5)
 
-            if row_obj.valid_count <= 1:
-                cross = Cross(row_obj, color=RED)
-                self.play(Create(cross), run_time=0.3)
-                self.play(FadeOut(row_obj), FadeOut(cross), FadeOut(count_label), run_time=0.5)
-            else:
-                check = Text("✔", color=GREEN, font_size=30).next_to(count_label, RIGHT)
-                self.play(FadeIn(check), run_time=0.3)
-                self.play(FadeOut(count_label), FadeOut(check), run_time=0.2)
+        summary = cached_text(f"Kept {int(keep.sum()):,} / {n_rows:,} samples", font_size=28, color=GREEN)
+        summary.next_to(table_group, DOWN)
+        self.play(FadeOut(more), Write(summary))
 
         self.wait(1)
-        self.play(FadeOut(table_group), FadeOut(title), FadeOut(subtitle), FadeOut(logic_text))
-
-    def xgboost_logic_scene(self):
-        title = Text("Step 2: XGBoost Training", font_size=40, color=BLUE).to_edge(UP)
-        subtitle = Text("Ensemble of Weak Learners (Trees)", font_size=24, color=GRAY).next_to(title, DOWN)
+        self.play(FadeOut(table_group), FadeOut(title), FadeOut(subtitle), FadeOut(logic_text), FadeOut(summary))
+
+    def select_patient(self, headers, columns):
+        if self.patient_id is None:
+            markers = biomarker_filter.check_markers(headers, self.markers)
+            kept = np.flatnonzero(biomarker_filter.preprocess(columns, markers)["keep"])
+            if not len(kept):
+                raise ValueError("no patient passes the biomarker filter; set patient_id explicitly")
+            return int(kept[0])
+        rows = np.flatnonzero(columns[biomarker_filter.ID_COLUMN] == str(self.patient_id))
+        if not len(rows):
+            raise KeyError(f"patient {self.patient_id!r} not found in the cohort")
+        return int(rows[0])
+
+    def explain_patient(self, headers, columns):
+        """用真实模型解释选中患者: 贡献最大的树 + SHAP 力图 (SHAP 值优先取缓存)"""
+        # 只有给了模型文件才需要，示例数据渲染不导入
+        import shap_engine
+
+        forest = _load_forest(self.model_path)
+        row = self.select_patient(headers, columns)
+        x = forest.features_from_columns(columns, row, biomarker_filter.ID_COLUMN)
+        patient_id = columns[biomarker_filter.ID_COLUMN][row]
+        values, base = shap_engine.explain_cohort(self.model_path, [patient_id], x)
+
+        order = np.argsort(-np.abs(values[0]), kind="stable")[:self.top_features]
+        names = forest.feature_columns(columns, biomarker_filter.ID_COLUMN)
+        contribs = [(f"{names[j]} = {x[0, j]:g}", float(values[0, j])) for j in order]
+        force = {"base": base, "contribs": contribs, "high_risk": bool(forest.predict(x)[0] >= 0.5)}
+        return forest.explain_row(x[0], self.top_trees), force
+
+    def xgboost_logic_scene(self, ensemble):
+        title = cached_text("Step 2: XGBoost Training", font_size=40, color=BLUE).to_edge(UP)
+        subtitle = cached_text("Ensemble of Weak Learners (Trees)", font_size=24, color=GRAY).next_to(title, DOWN)
         self.play(Write(title), FadeIn(subtitle))
 
         trees = VGroup()
         scores = []
         positions = [LEFT * 4, ORIGIN, RIGHT * 4]
-        tree_scores = [0.5, 0.3, 0.1]
 
-        for i, pos in enumerate(positions):
+        for info, pos in zip(ensemble["trees"], positions):
             tree = VGroup()
-            root = Circle(radius=0.4, color=WHITE).move_to(pos + UP)
-            left = Circle(radius=0.4, color=GREEN if i == 0 else WHITE).move_to(pos + LEFT * 1.2 + DOWN * 0.8)
-            right = Circle(radius=0.4, color=RED if i == 0 else WHITE).move_to(pos + RIGHT * 1.2 + DOWN * 0.8)
+            lines, root, left, right = self.template("xgb_tree", self.tree_skeleton).shift(pos)
+            # 患者走的分支: 提高风险为红色，降低风险为绿色
+            taken = left if info["path_left"] else right
+            taken.set_color(RED if info["score"] > 0 else GREEN)
 
-            lines = VGroup(Line(root.get_bottom(), left.get_top()), Line(root.get_bottom(), right.get_top()))
-            label = Text(f"Tree {i + 1}", font_size=24).next_to(root, UP)
-            val_text = Text(f"+{tree_scores[i]}", font_size=28, color=YELLOW).move_to(right.get_center())
+            label = cached_text(info["name"], font_size=24).next_to(root, UP)
+            val_text = Text(f"{info['score']:+.2g}", font_size=28, color=YELLOW).move_to(taken.get_center())
 
             tree.add(lines, root, left, right, label, val_text)
+            if info["split"]:
+                tree.add(cached_text(info["split"], font_size=16).move_to(root.get_center()).scale_to_fit_width(
+                    root.width * 0.9))
             trees.add(tree)
 
             self.play(FadeIn(tree, shift=UP))
@@ -143,78 +265,77 @@ class XGBoostShapViz(Scene):
         # 整体稍微下移一点，防止撞到标题
         trees.move_to(UP * 0.5)
 
-        equation = Text("Logits = Sum(TreeScores) = 0.5 + 0.3 + 0.1 = 0.9", font_size=36).to_edge(DOWN).shift(UP)
+        terms = [f"{info['score']:.2g}" for info in ensemble["trees"]]
+        if ensemble["base"]:
+            terms.insert(0, f"{ensemble['base']:.2g}")
+        if ensemble["rest"]:
+            terms.append(f"({ensemble['rest']:.2g} other trees)")
+        equation = Text(f"Logits = Sum(TreeScores) = {' + '.join(terms)} = {ensemble['logit']:.2g}", font_size=36)
+        if equation.width > config.frame_width - 1:
+            equation.scale_to_fit_width(config.frame_width - 1)
+        equation.to_edge(DOWN).shift(UP)
         self.play(Write(equation))
 
         frame = SurroundingRectangle(trees, color=YELLOW, buff=0.2)
-        text_ensemble = Text("Ensemble Model", color=YELLOW, font_size=28).next_to(frame, UP)
+        text_ensemble = cached_text("Ensemble Model", color=YELLOW, font_size=28).next_to(frame, UP)
 
         self.play(Create(frame), Write(text_ensemble))
         self.wait(2)
         self.play(FadeOut(trees), FadeOut(equation), FadeOut(frame), FadeOut(text_ensemble), FadeOut(title),
                   FadeOut(subtitle))
 
-    def shap_force_scene(self):
-        title = Text("Step 3: SHAP Explanation", font_size=40, color=BLUE).to_edge(UP)
-        subtitle = Text("Why is this patient 'High Risk'?", font_size=24, color=GRAY).next_to(title, DOWN)
+    def shap_force_scene(self, force):
+        title = cached_text("Step 3: SHAP Explanation", font_size=40, color=BLUE).to_edge(UP)
+        risk = "High Risk" if force["high_risk"] else "Low Risk"
+        subtitle = cached_text(f"Why is this patient '{risk}'?", font_size=24, color=GRAY).next_to(title, DOWN)
         self.play(Write(title), FadeIn(subtitle))
 
+        # 光标依次经过的位置: base -> base + phi_1 -> ...
+        base_val = force["base"]
+        stops = base_val + np.cumsum([0.0] + [v for _, v in force["contribs"]])
+        x_min = np.floor(min(stops.min(), 0.0) * 2) / 2
+        x_max = np.ceil(max(stops.max(), x_min + 0.5) * 2) / 2
+
         # === 坐标轴 ===
         number_line = NumberLine(
-            x_range=[0, 1, 0.1],
+            x_range=[x_min, x_max, (x_max - x_min) / 10],
             length=12,  # 加长坐标轴
             color=GRAY,
             include_numbers=False,
         ).shift(DOWN * 1)
 
         labels = VGroup()
-        for x in [0, 0.5, 1.0]:
-            label = Text(str(x), font_size=24).next_to(number_line.n2p(x), DOWN)
+        for x in [x_min, (x_min + x_max) / 2, x_max]:
+            label = cached_text(f"{x:g}", font_size=24).next_to(number_line.n2p(x), DOWN)
             labels.add(label)
 
         self.play(Create(number_line), Write(labels))
 
         # 初始状态
-        base_val = 0.1
         current_pos = number_line.n2p(base_val)
 
         cursor = Triangle(color=WHITE, fill_opacity=1).scale(0.2).rotate(PI).move_to(current_pos + UP * 0.3)
-        lbl_base = Text("Base Value", font_size=24).next_to(cursor, UP)
+        lbl_base = cached_text("Base Value", font_size=24).next_to(cursor, UP)
 
         self.play(FadeIn(cursor), Write(lbl_base))
 
-        # 特征 1
-        shap_ca199 = 0.5
-        new_val_1 = base_val + shap_ca199
-        arrow_1 = Arrow(start=number_line.n2p(base_val), end=number_line.n2p(new_val_1), color=RED, buff=0,
-                        stroke_width=8).shift(UP * 0.5)
-        label_1 = Text("CA199 = High", font_size=24, color=RED).next_to(arrow_1, UP)
-
-        self.play(GrowArrow(arrow_1), Write(label_1))
-        self.play(cursor.animate.move_to(number_line.n2p(new_val_1) + UP * 0.3))
-
-        # 特征 2
-        shap_age = -0.1
-        new_val_2 = new_val_1 + shap_age
-        arrow_2 = Arrow(start=number_line.n2p(new_val_1), end=number_line.n2p(new_val_2), color=BLUE, buff=0,
-                        stroke_width=8).shift(UP * 0.5)
-        label_2 = Text("Age = 35", font_size=24, color=BLUE).next_to(arrow_2, DOWN * 3.5)
-
-        self.play(GrowArrow(arrow_2), Write(label_2))
-        self.play(cursor.animate.move_to(number_line.n2p(new_val_2) + UP * 0.3))
-
-        # 特征 3
-        shap_cea = 0.4
-        final_val = new_val_2 + shap_cea
-        arrow_3 = Arrow(start=number_line.n2p(new_val_2), end=number_line.n2p(final_val), color=RED, buff=0,
-                        stroke_width=8).shift(UP * 0.5)
-        label_3 = Text("CEA = High", font_size=24, color=RED).next_to(arrow_3, UP)
+        # 特征贡献按 |SHAP| 从大到小依次画出; 正向 (升高风险) 为红色，标签在上，负向为蓝色，标签在下
+        for (name, _), start, end in zip(force["contribs"], stops[:-1], stops[1:]):
+            color = RED if end >= start else BLUE
+            arrow = Arrow(start=number_line.n2p(start), end=number_line.n2p(end), color=color, buff=0,
+                          stroke_width=8).shift(UP * 0.5)
+            label = cached_text(name, font_size=24, color=color)
+            if end >= start:
+                label.next_to(arrow, UP)
+            else:
+                label.next_to(arrow, DOWN * 3.5)
 
-        self.play(GrowArrow(arrow_3), Write(label_3))
-        self.play(cursor.animate.move_to(number_line.n2p(final_val) + UP * 0.3))
+            self.play(GrowArrow(arrow), Write(label))
+            self.play(cursor.animate.move_to(number_line.n2p(end) + UP * 0.3))
 
         # 结果
-        result_text = Text("Final Prediction: High Risk", font_size=48, color=RED).to_edge(DOWN)
+        result_text = cached_text(f"Final Prediction: {risk}", font_size=48, color=RED if force["high_risk"] else GREEN)
+        result_text.to_edge(DOWN)
         self.play(Write(result_text))
 
         self.wait(3)